@@ -0,0 +1,53 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+"""
+RocksStore put_df / get_df / get_df(columns=2) latency per DataFrame codec,
+for narrow and wide frames.
+
+    PYTHONPATH=. python benchmarks/bench_df_codec.py [n_rows] [repeats]
+"""
+
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from metascribe.df_codec import CODECS
+from metascribe.rocks_store import RocksStore
+
+def make_df(n_rows, n_cols):
+    rng = np.random.default_rng(0)
+    cols = {}
+    for j in range(n_cols):
+        if j % 4 == 3:
+            cols[f"c{j}"] = [f"node{i % 64}" for i in range(n_rows)]
+        else:
+            cols[f"c{j}"] = rng.random(n_rows)
+    return pd.DataFrame(cols)
+
+def timed(fn, repeats):
+    t0 = time.perf_counter()
+    for i in range(repeats):
+        fn(i)
+    return (time.perf_counter() - t0) / repeats * 1e6
+
+def bench(n_rows, repeats):
+    print(f"{'cols':>5s} {'codec':10s} {'bytes':>9s} {'put us':>9s} {'get us':>9s} {'get 2 cols us':>14s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        with RocksStore(f"{tmp}/db") as store:
+            for n_cols in (4, 64, 512):
+                df = make_df(n_rows, n_cols)
+                for codec in CODECS:
+                    put = timed(lambda i: store.put_df(f"/{codec}/{n_cols}/{i}", df, codec=codec), repeats)
+                    size = len(store._store[f"/{codec}/{n_cols}/0"])
+                    get = timed(lambda i: store.get_df(f"/{codec}/{n_cols}/{i}"), repeats)
+                    get2 = timed(lambda i: store.get_df(f"/{codec}/{n_cols}/{i}", columns=["c0", "c3"]), repeats)
+                    print(f"{n_cols:5d} {codec:10s} {size:9d} {put:9.0f} {get:9.0f} {get2:14.0f}")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+          int(sys.argv[2]) if len(sys.argv) > 2 else 50)
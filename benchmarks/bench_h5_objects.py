@@ -0,0 +1,72 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+"""
+File size, write time, open + first read and random-read latency of small
+JSON objects in H5Store: one table node per object vs. compact_objects.
+
+    PYTHONPATH=. python benchmarks/bench_h5_objects.py [n_objects] [n_legacy]
+
+Per-node puts are slow, so the legacy layout is measured on n_legacy
+objects (default 2,000) and reported per object.
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import warnings
+from metascribe.h5_store import H5Store
+
+def make_objects(n):
+    return {f"/configs/exp{i // 1000}/run{i}": {"lr": 0.001 * (i % 7), "batch_size": 64,
+                                                "model": {"layers": [12, 23, i % 97], "type": "transformer"}}
+            for i in range(n)}
+
+def bench_layout(path, objs, compact):
+    keys = list(objs)
+    t0 = time.perf_counter()
+    with H5Store(path, mode='w', compact_objects=compact) as store:
+        if compact:
+            store.put_many_json(objs)
+        else:
+            for key, obj in objs.items():
+                store.put_json(key, obj)
+    write = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with H5Store(path, mode='r', compact_objects=compact) as store:
+        store.get_json(keys[-1])
+        first = time.perf_counter() - t0
+        sample = random.Random(0).sample(keys, min(1000, len(keys)))
+        t0 = time.perf_counter()
+        for key in sample:
+            store.get_json(key)
+        read = (time.perf_counter() - t0) / len(sample)
+        t0 = time.perf_counter()
+        store.get_many_json(sample)
+        read_many = (time.perf_counter() - t0) / len(sample)
+    return dict(n=len(objs), size=os.path.getsize(path), write=write,
+                first=first, read=read, read_many=read_many)
+
+def bench(n, n_legacy):
+    warnings.simplefilter("ignore")  # PyTables NaturalNameWarning for legacy keys
+    objs = make_objects(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "per-node": bench_layout(f"{tmp}/legacy.h5", dict(list(objs.items())[:n_legacy]), False),
+            "compact": bench_layout(f"{tmp}/compact.h5", objs, True),
+        }
+    print(f"{'layout':9s} {'objects':>8s} {'bytes/obj':>10s} {'write us/obj':>13s} "
+          f"{'open+get ms':>12s} {'get us':>8s} {'get_many us/obj':>16s}")
+    for name, r in results.items():
+        print(f"{name:9s} {r['n']:8d} {r['size'] / r['n']:10.0f} {r['write'] / r['n'] * 1e6:13.0f} "
+              f"{r['first'] * 1e3:12.1f} {r['read'] * 1e6:8.0f} {r['read_many'] * 1e6:16.1f}")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+          int(sys.argv[2]) if len(sys.argv) > 2 else 2_000)
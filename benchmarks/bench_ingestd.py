@@ -0,0 +1,62 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+"""
+Per-record cost of what md-store does after startup, with `concurrency`
+jobs ending at once: parse + open SQLite + INSERT + commit (direct) vs. one
+request to md-ingestd, which parses with a warm template cache and
+group-commits.
+
+    PYTHONPATH=. python benchmarks/bench_ingestd.py [n_jobs] [concurrency]
+"""
+
+import sys
+import time
+import sqlite3
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from metascribe.ingestd import IngestServer, send_record
+from metascribe.parser import parse_with_template, TemplateCache
+from metascribe.sql_store import SQLStore
+
+TEMPLATE, FILE = "tests/files/template1.py", "tests/files/actual1.py"
+
+def direct(sql_path, i):
+    # a fresh process has a cold template cache
+    row = parse_with_template(TEMPLATE, FILE, cache=TemplateCache())
+    with SQLStore(sql_path) as store:
+        store.store("jobs", pk="jobid", jobid=i, **row)
+
+def via_daemon(socket_path, sql_path, i):
+    reply = send_record(socket_path, {"sql_path": sql_path, "table": "jobs", "pk": "jobid",
+                                      "kv": {"jobid": i}, "template": TEMPLATE, "file": FILE})
+    assert reply["ok"], reply
+
+def run(n, concurrency, job, sql_path):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(job, range(n)))
+    elapsed = time.perf_counter() - t0
+    con = sqlite3.connect(sql_path)
+    assert con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == n
+    con.close()
+    return elapsed
+
+def bench(n, concurrency):
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(None):
+        t_direct = run(n, concurrency, lambda i: direct(f"{tmp}/direct.db", i), f"{tmp}/direct.db")
+        with IngestServer(f"{tmp}/ingestd.sock") as server:
+            t_daemon = run(n, concurrency, lambda i: via_daemon(f"{tmp}/ingestd.sock", f"{tmp}/daemon.db", i),
+                           f"{tmp}/daemon.db")
+    print(f"{n} records, {concurrency} jobs at a time")
+    print(f"direct     {t_direct / n * 1e3:7.2f} ms/record  {n / t_direct:7.0f} records/s  ({n} commits)")
+    print(f"md-ingestd {t_daemon / n * 1e3:7.2f} ms/record  {n / t_daemon:7.0f} records/s  "
+          f"({server.commits} commits)")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000,
+          int(sys.argv[2]) if len(sys.argv) > 2 else 16)
@@ -0,0 +1,88 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+"""
+Time and peak RSS of parsing a synthetic multi-GB output file (header
+block, per-iteration lines, summary block). Every mode runs in a fresh
+subprocess so that peak RSS is measured in isolation.
+
+    PYTHONPATH=. python benchmarks/bench_large_file.py [size_gb] [--read-text]
+
+--read-text also runs the read_text() + regex path of parse_with_template,
+which needs several times the file size in memory.
+"""
+
+import os
+import sys
+import time
+import json
+import resource
+import tempfile
+import subprocess
+
+HEAD = """=== job {{ jobid }} on {{ nodes }} nodes ===
+"""
+TAIL = """=== summary ===
+bandwidth: {{ bw }} MiB/s
+status: {{ status }}
+"""
+
+def make_file(path, size_gb):
+    line = b"iter 000000000: bandwidth 1234.5 MiB/s, latency 0.00042 s\n"
+    block = line * (1 << 14)
+    target = int(size_gb * (1 << 30))
+    with open(path, "wb") as f:
+        f.write(b"=== job 42 on 8 nodes ===\n")
+        written = 0
+        while written < target:
+            f.write(block)
+            written += len(block)
+        f.write(b"=== summary ===\nbandwidth: 1234.5 MiB/s\nstatus: OK\n")
+
+def run_mode(mode, path):
+    from metascribe.parser import CompiledTemplate
+    from metascribe.stream import parse_mmap, parse_head_tail
+    head, tail = CompiledTemplate(HEAD), CompiledTemplate(TAIL)
+    t0 = time.perf_counter()
+    if mode == "head_tail":
+        data = parse_head_tail(path, head, tail)
+    elif mode == "mmap_head":
+        data = parse_mmap(head, path)
+    elif mode == "mmap_tail":
+        data = parse_mmap(tail, path)   # scans the whole mapping for the summary
+    elif mode == "read_text":
+        from pathlib import Path
+        text = Path(path).read_text()
+        data = tail.match(text)
+    elapsed = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"mode": mode, "seconds": elapsed, "peak_rss_mb": peak_mb, "data": data}))
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    size_gb = float(args[0]) if args else 2.0
+    modes = ["head_tail", "mmap_head", "mmap_tail"]
+    if "--read-text" in sys.argv:
+        modes.append("read_text")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.out")
+        make_file(path, size_gb)
+        print(f"file size: {os.path.getsize(path) / (1 << 30):.2f} GiB")
+        for mode in modes:
+            out = subprocess.run([sys.executable, __file__, "--run", mode, path],
+                                 capture_output=True, text=True, env={**os.environ})
+            if out.returncode != 0:
+                print(f"{mode:10s}: failed\n{out.stderr}")
+                continue
+            rec = json.loads(out.stdout)
+            print(f"{mode:10s}: {rec['seconds']:8.3f} s   peak RSS {rec['peak_rss_mb']:8.1f} MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_mode(sys.argv[2], sys.argv[3])
+    else:
+        main()
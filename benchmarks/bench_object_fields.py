@@ -0,0 +1,56 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+"""
+Config search over Parquet store objects: scanning and json-decoding every
+object in Python vs. filtering on shredded object_fields in duckdb.
+
+    PYTHONPATH=. python benchmarks/bench_object_fields.py [n_objects]
+"""
+
+import sys
+import time
+import tempfile
+from metascribe.parquet_store import ParquetStoreWriter, ParquetStoreReader
+
+FIELDS = {"model.type": "string", "batch_size": "int64"}
+
+def make_config(i):
+    return {"lr": 0.001 * (i % 7), "batch_size": 16 * (i % 8),
+            "model": {"type": "transformer" if i % 5 == 0 else "cnn", "layers": [12, 23, i % 97]},
+            "tags": [f"t{i % 13}", f"host{i % 64}"]}
+
+def bench(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        w = ParquetStoreWriter(tmp, obj_shard_rows=250_000, object_fields=FIELDS)
+        for i in range(n):
+            w.put_object(f"/exp{i // 10_000}/run{i}/config", make_config(i), ts=i)
+        w.close()
+
+        with ParquetStoreReader(tmp) as reader:
+            t0 = time.perf_counter()
+            decoded = [k for k, obj in reader.scan("/", latest=True)
+                       if obj["model"]["type"] == "transformer" and obj["batch_size"] >= 64]
+            scan = time.perf_counter() - t0
+
+            filters = [("model.type", "==", "transformer"), ("batch_size", ">=", 64)]
+            t0 = time.perf_counter()
+            found = reader.find(filters)
+            find = time.perf_counter() - t0
+            assert found == sorted(decoded)
+
+            t0 = time.perf_counter()
+            objs = list(reader.scan("/", filters=filters, latest=True))
+            scan_filtered = time.perf_counter() - t0
+            assert len(objs) == len(found)
+
+    print(f"{n} objects, {len(found)} matches")
+    print(f"scan + json.loads + filter in Python {scan * 1e3:10.1f} ms")
+    print(f"find(filters)                        {find * 1e3:10.1f} ms")
+    print(f"scan(filters=...)                    {scan_filtered * 1e3:10.1f} ms")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,55 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+"""
+Rows/sec of SQLStore.store (one DDL + INSERT + commit per row) vs.
+SQLStore.store_many, with default and WAL/synchronous=NORMAL pragmas.
+
+    PYTHONPATH=. python benchmarks/bench_sql_store.py [n_rows]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import contextlib
+from metascribe.sql_store import SQLStore
+
+def make_rows(n):
+    return [{"jobid": i, "jobname": f"job{i}", "nnodes": 1 + i % 16, "ntasks": 16,
+             "partition": "xxx", "xfer_size": "16m", "runtime": 12.5 + i} for i in range(n)]
+
+def bench(n):
+    rows = make_rows(n)
+    n_single = min(n, 2000)  # per-row commits are slow; extrapolate from a subset
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+
+        path = os.path.join(tmp, "single.db")
+        with SQLStore(path) as store, contextlib.redirect_stdout(open(os.devnull, "w")):
+            t0 = time.perf_counter()
+            for row in rows[:n_single]:
+                store.store("jobs", pk="jobid", **row)
+            results["store (per row)"] = n_single / (time.perf_counter() - t0)
+
+        path = os.path.join(tmp, "many.db")
+        with SQLStore(path) as store, contextlib.redirect_stdout(open(os.devnull, "w")):
+            t0 = time.perf_counter()
+            store.store_many("jobs", rows, pk="jobid")
+            results["store_many"] = n / (time.perf_counter() - t0)
+
+        path = os.path.join(tmp, "wal.db")
+        with SQLStore(path, journal_mode="WAL", synchronous="NORMAL", cache_size=-65536) as store, \
+                contextlib.redirect_stdout(open(os.devnull, "w")):
+            t0 = time.perf_counter()
+            store.store_many("jobs", rows, pk="jobid")
+            results["store_many + WAL"] = n / (time.perf_counter() - t0)
+
+    for name, rate in results.items():
+        print(f"{name:18s}: {rate:12,.0f} rows/s")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
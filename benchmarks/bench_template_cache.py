@@ -0,0 +1,65 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+"""
+Per-file parse cost of parse_with_template with a cold template cache
+(every call converts the template, as before the cache existed) vs. a
+warm one.
+
+    PYTHONPATH=. python benchmarks/bench_template_cache.py [n_files]
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+from jinja2 import Template
+from metascribe.parser import TemplateCache, parse_with_template
+
+TEMPLATE = "tests/files/template1.py"
+
+def render_files(out_dir, n):
+    template = Template(Path(TEMPLATE).read_text(), keep_trailing_newline=True)
+    paths = []
+    for i in range(n):
+        p = Path(out_dir) / f"job_{i}.sh"
+        p.write_text(template.render(
+            jobname=f"job{i}", output_file=f"reports/out_{i}.out", account="cstao",
+            time="00:30:00", nnodes=1 + i % 8, ntasks=16, cpus_per_task=1, partition="xxx",
+            module_loads="ml purge\nml GCC OpenMPI", api="mpiio", xfer_size="16m",
+            block_size="2g", segment_size=1 + i % 4))
+        paths.append(p)
+    return paths
+
+def bench(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = render_files(tmp, n)
+
+        t0 = time.perf_counter()
+        for p in paths:
+            parse_with_template(TEMPLATE, p, cache=TemplateCache())
+        cold = (time.perf_counter() - t0) / n
+
+        warm_cache = TemplateCache()
+        t0 = time.perf_counter()
+        for p in paths:
+            parse_with_template(TEMPLATE, p, cache=warm_cache)
+        warm = (time.perf_counter() - t0) / n
+
+        disk_dir = Path(tmp) / "cache"
+        parse_with_template(TEMPLATE, paths[0], cache=TemplateCache(cache_dir=disk_dir))
+        t0 = time.perf_counter()
+        for p in paths:
+            parse_with_template(TEMPLATE, p, cache=TemplateCache(cache_dir=disk_dir))
+        disk = (time.perf_counter() - t0) / n
+
+    print(f"files: {n}")
+    print(f"cold cache : {cold * 1e6:8.1f} us/file")
+    print(f"disk cache : {disk * 1e6:8.1f} us/file (new process-level cache per file)")
+    print(f"warm cache : {warm * 1e6:8.1f} us/file")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
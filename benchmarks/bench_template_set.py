@@ -0,0 +1,77 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+"""
+Classifying files among many templates: trying every template's
+extraction regex in turn (the sequential baseline) vs. TemplateSet, which
+shortlists templates by their literal fragments first.
+
+    PYTHONPATH=. python benchmarks/bench_template_set.py [n_templates] [n_files]
+"""
+
+import sys
+import time
+from pathlib import Path
+from jinja2 import Template
+from metascribe.parser import jinja_to_regex
+from metascribe.template_set import TemplateSet
+
+TEMPLATE = "tests/files/template1.py"
+
+def make_templates(n):
+    # variants of one job script that only differ in the benchmark they run,
+    # the way a site's templates tend to share their #SBATCH header
+    base = Path(TEMPLATE).read_text()
+    return {f"bench{k}": base.replace("srun pr ", f"srun bench{k} --mode=m{k % 5} ")
+            for k in range(n)}
+
+def render(template_text, i):
+    return Template(template_text, keep_trailing_newline=True).render(
+        jobname=f"job{i}", output_file=f"reports/out_{i}.out", account="cstao",
+        time="00:30:00", nnodes=1 + i % 8, ntasks=16, cpus_per_task=1, partition="xxx",
+        module_loads="ml purge\nml GCC OpenMPI", api="mpiio", xfer_size="16m",
+        block_size="2g", segment_size=1 + i % 4)
+
+def sequential_match(regexes, text):
+    for tid, regex in regexes.items():
+        match = regex.search(text)
+        if match:
+            return tid, match.groupdict()
+    raise ValueError("Could not match any template with rendered file.")
+
+def bench(n_templates, n_files):
+    templates = make_templates(n_templates)
+    ids = list(templates)
+    texts = [(ids[i % n_templates], render(templates[ids[i % n_templates]], i)) for i in range(n_files)]
+
+    regexes = {tid: jinja_to_regex(text) for tid, text in templates.items()}
+    t0 = time.perf_counter()
+    for tid, text in texts:
+        assert sequential_match(regexes, text)[0] == tid
+    sequential = (time.perf_counter() - t0) / n_files
+
+    tset = TemplateSet()
+    for tid, text in templates.items():
+        tset.add(tid, text)
+    tset.candidates("")  # build the index outside the timed loop
+    t0 = time.perf_counter()
+    for tid, text in texts:
+        tset.candidates(text)
+    shortlist = (time.perf_counter() - t0) / n_files
+
+    t0 = time.perf_counter()
+    for tid, text in texts:
+        assert tset.match(text)[0] == tid
+    matched = (time.perf_counter() - t0) / n_files
+
+    print(f"templates: {n_templates}, files: {n_files}")
+    print(f"sequential regex  : {sequential * 1e6:8.1f} us/file")
+    print(f"TemplateSet.match : {matched * 1e6:8.1f} us/file "
+          f"(shortlisting {shortlist * 1e6:.1f} us)")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 48,
+          int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,62 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import multiprocessing
+from pathlib import Path
+from metascribe.parser import CompiledTemplate, default_cache
+
+# per-worker state, set once by _init_worker
+_template = None
+_engine = "regex"
+
+
+def _init_worker(template_text, engine):
+    global _template, _engine
+    _template = default_cache.get(template_text)
+    _engine = engine
+
+
+def _parse_one(path):
+    """Parse a single file; failures become error records instead of raising."""
+    try:
+        data = _template.match(Path(path).read_text(), engine=_engine)
+        return {"path": str(path), "error": None, "data": data}
+    except Exception as e:
+        return {"path": str(path), "error": f"{type(e).__name__}: {e}", "data": None}
+
+
+def parse_many(template, paths, workers=None, chunksize=64, engine="regex"):
+    """
+    Parse many files against one template and yield one record per file, in
+    input order: {"path": ..., "error": None | str, "data": dict | None}.
+
+    `template` is a template path or a CompiledTemplate. With workers > 1 the
+    files are distributed in chunks of `chunksize` over a process pool in
+    which every worker compiles the template once.
+    """
+    if isinstance(template, CompiledTemplate):
+        template_text = template.text
+    else:
+        template_text = Path(template).read_text()
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        _init_worker(template_text, engine)
+        for path in paths:
+            yield _parse_one(path)
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(template_text, engine)) as pool:
+        yield from pool.imap(_parse_one, paths, chunksize=chunksize)
+
+
+def template_variables(template):
+    """Variable names of a template in first-occurrence order (e.g. CSV columns)."""
+    if not isinstance(template, CompiledTemplate):
+        template = default_cache.load(template)
+    return list(dict.fromkeys(template.groups.values()))
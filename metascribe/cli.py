@@ -4,36 +4,122 @@
 # A copy of the license should have been distributed with this software in 
 # the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
 
+import os
 import sys
+import csv
+import glob
+import json
+import time
+import signal
 from pathlib import Path
 import argparse
-from metascribe.parser import parse_with_template
+from metascribe.parser import parse_with_template, TemplateCache
+from metascribe.batch import parse_many, template_variables
 from metascribe.sql_store import SQLStore
+from metascribe.spool import spool_record, ingest_spool
+from metascribe.ingestd import IngestServer, IngestdUnavailable, send_record
+# follow and parquet_compact pull in pyarrow/pandas/duckdb; they are imported
+# where used so that md-store (run once per job) starts quickly.
 
 def md_parser():
-    if len(sys.argv) != 3:
-        print("Usage: ms-parser <template_file> <actual_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        prog="md-parser",
+        usage="md-parser <template_file> <actual_file>\n"
+              "       md-parser <template_file> (--glob PATTERN | --files-from LIST) [--format jsonl|csv] [--workers N]",
+        description="Match files against a Jinja2 template and print the extracted variables.")
+    parser.add_argument("template_file")
+    parser.add_argument("actual_file", nargs="?")
+    parser.add_argument("--glob", help="Parse all files matching this glob pattern (** is recursive)")
+    parser.add_argument("--files-from", help="Parse the files listed in this file, one per line ('-' for stdin)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="Output format for batch mode")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=64, help="Files handed to a worker at a time")
+    parser.add_argument("--engine", choices=["regex", "anchor"], default="regex", help="Template matching engine")
+    parser.add_argument("--follow", nargs="+", metavar="FILE",
+                        help="Treat the template as a record template and stream records appended to these files")
+    parser.add_argument("--state", help="Checkpoint file with per-file offsets for --follow")
+    parser.add_argument("--interval", type=float, default=1.0, help="Maximum seconds between polls for --follow")
+    parser.add_argument("--poll", action="store_true", help="Do not use inotify for --follow")
+    args = parser.parse_args()
 
-    template_file = sys.argv[1]
-    actual_file = sys.argv[2]
+    template_file = args.template_file
+    actual_file = args.actual_file
 
     if not Path(template_file).is_file():
         print(f"Template file '{template_file}' does not exist.")
         sys.exit(1)
 
+    if args.follow:
+        _md_parser_follow(args)
+        return
+
+    if args.glob or args.files_from:
+        _md_parser_batch(args)
+        return
+
+    if actual_file is None:
+        parser.print_usage()
+        sys.exit(1)
+
     if not Path(actual_file).is_file():
         print(f"Actual file '{actual_file}' does not exist.")
         sys.exit(1)
 
     try:
-        result = parse_with_template(template_file, actual_file)
+        result = parse_with_template(template_file, actual_file, engine=args.engine)
         for k, v in result.items():
             print(f"{k}: {v}")
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
-        
+
+
+def _iter_batch_paths(args):
+    if args.glob:
+        yield from glob.iglob(args.glob, recursive=True)
+    if args.files_from:
+        stream = sys.stdin if args.files_from == "-" else open(args.files_from)
+        try:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield line
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def _md_parser_batch(args):
+    """Stream one JSONL/CSV record per file to stdout."""
+    records = parse_many(args.template_file, _iter_batch_paths(args), workers=args.workers,
+                         chunksize=args.chunksize, engine=args.engine)
+    if args.format == "csv":
+        fields = ["path", "error"] + template_variables(args.template_file)
+        writer = csv.DictWriter(sys.stdout, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+    n_failed = 0
+    for rec in records:
+        row = {"path": rec["path"], "error": rec["error"], **(rec["data"] or {})}
+        n_failed += rec["error"] is not None
+        if args.format == "csv":
+            writer.writerow(row)
+        else:
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+    if n_failed:
+        print(f"{n_failed} file(s) could not be parsed.", file=sys.stderr)
+
+def _md_parser_follow(args):
+    """Print one JSONL record per record appended to the followed files."""
+    from metascribe.follow import IncrementalParser, follow
+    incremental = IncrementalParser(args.template_file, state_path=args.state)
+    try:
+        for path, table in follow(incremental, args.follow, interval=args.interval, use_inotify=not args.poll):
+            for row in table.to_pylist():
+                sys.stdout.write(json.dumps({"path": path, **row}, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+
 def md_store():
     #e.g.,  md-store --md_table=xxx --kv_jobid=111 --kv_iked=123 --md_template ./tests/files/template1.py --md_file ./tests/files/actual1.py --sql_path=test.db --pk=jobid
     
@@ -43,27 +129,49 @@ def md_store():
     parser.add_argument("--template", help="Path to template file")
     parser.add_argument("--file", help="Path to the script file")
     parser.add_argument("--table", default="job_metadata", help="Target SQL table", required=True)
-    parser.add_argument("--sql_path", help="Path to SQLite database", required=True)
+    parser.add_argument("--sql_path", help="Path to SQLite database")
+    parser.add_argument("--spool", help="Write the record to this spool directory for md-ingest instead of the database")
     parser.add_argument("--pk", help="Primary key column name", default=None)
+    parser.add_argument("--engine", choices=["regex", "anchor"], default="regex", help="Template matching engine")
+    parser.add_argument("--cache_dir", help="Directory for compiled template cache (default: $METASCRIBE_CACHE_DIR)", default=None)
+    parser.add_argument("--socket", default=os.environ.get("METASCRIBE_INGESTD_SOCKET"),
+                        help="Hand the record to the md-ingestd listening on this socket, writing it directly "
+                             "if none is running (default: $METASCRIBE_INGESTD_SOCKET)")
     
     # 2. Capture all other arguments (the ones we don't know yet)
     args, unknown = parser.parse_known_args()
+    if not args.sql_path and not args.spool:
+        parser.error("one of --sql_path or --spool is required")
     
     md_template = args.template
     md_file = args.file
     md_table = args.table
     sql_path = args.sql_path
     pk = args.pk
+    cache = TemplateCache(cache_dir=args.cache_dir) if args.cache_dir else None
+    kv_dict = _parse_kv_args(unknown)
+
+    if args.socket and sql_path and not args.spool:
+        if _md_store_via_daemon(args, kv_dict):
+            return
     
     md_parsed = {}
     if md_template and md_file:
         try:
-            md_parsed = parse_with_template(md_template, md_file)
+            md_parsed = parse_with_template(md_template, md_file, cache=cache, engine=args.engine)
         except Exception as e:
             print(f"Error parsing files: {e}")
             sys.exit(1)
     
-    # 3. Parse dynamic kv_ arguments into a dictionary
+    if args.spool:
+        path = spool_record(args.spool, md_table, {**md_parsed, **kv_dict}, pk=pk)
+        print(f"Spooled record for '{md_table}' to {path}")
+        return
+    with SQLStore(sql_path) as store:
+        store.store(md_table, pk=pk, **md_parsed, **kv_dict)
+
+def _parse_kv_args(unknown):
+    """Parse dynamic --kv_<name>=<value> arguments into a dictionary."""
     kv_dict = {}
     for kv in unknown:
         if kv.startswith("--kv_"):
@@ -75,12 +183,103 @@ def md_store():
                     val = int(val)
                 except ValueError:
                     pass
-                kv_dict[key] = val        
-    with SQLStore(sql_path) as store:
-        store.store(md_table, pk=pk, **md_parsed, **kv_dict)
-        
-          
+                kv_dict[key] = val
+    return kv_dict
+
+def _md_store_via_daemon(args, kv_dict):
+    """
+    Send the record to md-ingestd; False if no daemon is listening. Once
+    the request is sent the daemon may store it, so later errors are fatal
+    rather than a reason to write the record again.
+    """
+    request = {"sql_path": os.path.abspath(args.sql_path), "table": args.table, "pk": args.pk, "kv": kv_dict}
+    if args.template and args.file:
+        request.update(template=os.path.abspath(args.template), file=os.path.abspath(args.file),
+                       engine=args.engine)
+    try:
+        reply = send_record(args.socket, request)
+    except IngestdUnavailable:
+        return False
+    except OSError as e:
+        print(f"Error: no reply from md-ingestd, the record may or may not be stored: {e}")
+        sys.exit(1)
+    if not reply.get("ok"):
+        print(reply.get("error"))
+        sys.exit(1)
+    print(f"Successfully stored data in '{args.table}' via md-ingestd")
+    return True
+
+def md_ingest():
+    #e.g.,  md-ingest ./spool --sql_path=test.db
+    parser = argparse.ArgumentParser(description="Bulk-load records spooled by md-store --spool into a SQLite db.")
+    parser.add_argument("spool_dir", help="Spool directory written by md-store --spool")
+    parser.add_argument("--sql_path", help="Path to SQLite database", required=True)
+    parser.add_argument("--batch_size", type=int, default=10_000, help="Rows per transaction")
+    parser.add_argument("--wal", action="store_true", help="Use journal_mode=WAL and synchronous=NORMAL")
+    args = parser.parse_args()
+
+    pragmas = {"journal_mode": "WAL", "synchronous": "NORMAL"} if args.wal else {}
+    with SQLStore(args.sql_path, **pragmas) as store:
+        try:
+            n = ingest_spool(args.spool_dir, store, batch_size=args.batch_size)
+        except IOError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    print(f"Ingested {n} spooled records into '{args.sql_path}'")
+
+
+def md_compact():
+    #e.g.,  md-compact ./store --min_age=600
+    parser = argparse.ArgumentParser(description="Merge small Parquet store shards into large key-sorted shards.")
+    parser.add_argument("store_root", help="Root directory of a ParquetStoreWriter store")
+    parser.add_argument("--datasets", nargs="+", choices=["tables", "objects"], default=["tables", "objects"])
+    parser.add_argument("--min_age", type=float, default=300, help="Only compact shards older than this (seconds)")
+    parser.add_argument("--grace_period", type=float, default=3600,
+                        help="Keep replaced shards this long for readers still using them (seconds)")
+    parser.add_argument("--shard_rows", type=int, default=5_000_000, help="Target rows per compacted shard")
+    parser.add_argument("--row_group_rows", type=int, default=131_072, help="Rows per Parquet row group")
+    args = parser.parse_args()
+
+    from metascribe.parquet_compact import compact
+    stats = compact(args.store_root, datasets=args.datasets, min_age=args.min_age,
+                    grace_period=args.grace_period, target_shard_rows=args.shard_rows,
+                    row_group_rows=args.row_group_rows)
+    for name, s in stats.items():
+        print(f"{name}: merged {s['inputs']} shards into {s['outputs']} ({s['rows']} rows), "
+              f"deleted {s['deleted']} replaced shards")
+
 
-                
+def md_ingestd():
+    #e.g.,  md-ingestd --socket /tmp/md-ingestd.sock --wal
+    parser = argparse.ArgumentParser(
+        description="Serve md-store clients on a Unix socket, group-committing their records to SQLite.")
+    parser.add_argument("--socket", default=os.environ.get("METASCRIBE_INGESTD_SOCKET"),
+                        help="Unix socket to listen on (default: $METASCRIBE_INGESTD_SOCKET)")
+    parser.add_argument("--batch_size", type=int, default=10_000, help="Maximum records per commit")
+    parser.add_argument("--max_delay", type=float, default=0.0,
+                        help="Seconds to wait for more records before each commit")
+    parser.add_argument("--wal", action="store_true", help="Use journal_mode=WAL and synchronous=NORMAL")
+    parser.add_argument("--cache_dir", help="Directory for compiled template cache (default: $METASCRIBE_CACHE_DIR)", default=None)
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("--socket is required unless $METASCRIBE_INGESTD_SOCKET is set")
 
-    
\ No newline at end of file
+    pragmas = {"journal_mode": "WAL", "synchronous": "NORMAL"} if args.wal else {}
+    cache = TemplateCache(cache_dir=args.cache_dir) if args.cache_dir else None
+    server = IngestServer(args.socket, batch_size=args.batch_size, max_delay=args.max_delay,
+                          cache=cache, **pragmas)
+    try:
+        server.start()
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"md-ingestd listening on {args.socket}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    print(f"md-ingestd stored {server.records} records in {server.commits} commits")
@@ -0,0 +1,80 @@
+import io
+import pandas as pd
+import pyarrow as pa
+
+# Values written by an IPC codec start with an 8 byte header: MAGIC, one codec
+# byte and padding that keeps the IPC buffers 8-byte aligned. Parquet
+# values are stored bare (they start with b"PAR1"), so everything written
+# before codecs existed, and anything written with codec="parquet", still
+# decodes with older readers.
+MAGIC = b"MSDF"
+_HEADER_LEN = 8
+_IPC_COMPRESSION = {
+    "ipc": None,
+    "ipc-zstd": "zstd",
+    "ipc-lz4": "lz4",
+}
+_CODEC_IDS = {"ipc": 1, "ipc-zstd": 2, "ipc-lz4": 3}
+_CODEC_NAMES = {v: k for k, v in _CODEC_IDS.items()}
+CODECS = ("parquet",) + tuple(_CODEC_IDS)
+
+
+def encode_df(df: pd.DataFrame, codec: str = "parquet") -> bytes:
+    if codec == "parquet":
+        return df.to_parquet()
+    if codec not in _CODEC_IDS:
+        raise ValueError(f"Unknown DataFrame codec {codec!r}, expected one of {CODECS}")
+
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=_IPC_COMPRESSION[codec])
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    header = (MAGIC + bytes([_CODEC_IDS[codec]])).ljust(_HEADER_LEN, b"\0")
+    return header + sink.getvalue().to_pybytes()
+
+
+def value_codec(raw) -> str:
+    """Name of the codec a stored value was written with."""
+    if raw[:len(MAGIC)] == MAGIC:
+        return _CODEC_NAMES[raw[len(MAGIC)]]
+    return "parquet"
+
+
+def _index_columns(schema):
+    meta = schema.pandas_metadata or {}
+    # RangeIndex entries are dicts kept in the metadata, not columns.
+    return [c for c in meta.get("index_columns", []) if isinstance(c, str)]
+
+
+def decode_df(raw, columns=None) -> pd.DataFrame:
+    """
+    Decode a stored DataFrame. With `columns`, only those columns (plus the
+    stored index) are read; for IPC values the other columns are neither
+    copied nor decompressed.
+    """
+    codec = value_codec(raw)
+    if codec == "parquet":
+        return pd.read_parquet(io.BytesIO(raw), columns=columns)
+
+    # Zero-copy view past the header; uncompressed buffers are used in place.
+    buf = pa.py_buffer(raw)[_HEADER_LEN:]
+    reader = pa.ipc.open_file(buf)
+    if columns is None:
+        return reader.read_all().to_pandas()
+
+    schema = reader.schema
+    wanted = list(columns) + [c for c in _index_columns(schema) if c not in columns]
+    missing = [c for c in wanted if schema.get_field_index(c) < 0]
+    if missing:
+        raise KeyError(f"Columns {missing} not stored in this DataFrame")
+    if codec == "ipc":
+        # Nothing to decompress: selecting from the zero-copy table is free.
+        table = reader.read_all().select(wanted)
+    else:
+        # Re-open with only the wanted fields so the rest stay compressed.
+        options = pa.ipc.IpcReadOptions(
+            included_fields=sorted(schema.get_field_index(c) for c in wanted))
+        table = pa.ipc.open_file(buf, options=options).read_all().select(wanted)
+    # Column order follows the table, so no pandas-side reindex is needed.
+    return table.to_pandas()
@@ -0,0 +1,86 @@
+import os
+import time
+import fcntl
+
+
+class FileLock:
+    """
+    Advisory lock on `path` using fcntl.flock.
+
+    shared=True takes a reader lock (any number of holders), otherwise an
+    exclusive writer lock. The kernel drops the lock when the holder's file
+    descriptor closes, including when the process dies, so a crashed holder
+    never leaves a stale lock behind. The lock file itself is left in place;
+    removing it while others wait on it would let two holders in.
+    """
+    # Backoff bounds (seconds) while waiting with a timeout.
+    min_wait = 0.001
+    max_wait = 0.05
+
+    def __init__(self, path, shared=False, timeout=300):
+        self.path = path
+        self.shared = shared
+        self.timeout = timeout
+        self._fd = None
+
+    def acquire(self):
+        if self._fd is not None:
+            return self
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+        op = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        try:
+            if self.timeout is None:
+                # Blocks in the kernel and wakes as soon as the holder releases.
+                fcntl.flock(fd, op)
+            else:
+                self._acquire_with_timeout(fd, op)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        if not self.shared:
+            # Informational only: who holds the writer lock.
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, str(os.getpid()).encode(), 0)
+        return self
+
+    def _acquire_with_timeout(self, fd, op):
+        t0 = time.monotonic()
+        wait = self.min_wait
+        while True:
+            try:
+                fcntl.flock(fd, op | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() - t0 > self.timeout:
+                    holder = self._holder(fd)
+                    raise TimeoutError(f"Lock timeout: {self.path}"
+                                       + (f" (held by pid {holder})" if holder else ""))
+                time.sleep(wait)
+                wait = min(wait * 2, self.max_wait)
+
+    @staticmethod
+    def _holder(fd):
+        try:
+            return os.pread(fd, 32, 0).decode().strip() or None
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def locked(self):
+        return self._fd is not None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,184 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import json
+import time
+import select
+import ctypes
+import ctypes.util
+from pathlib import Path
+import pyarrow as pa
+from metascribe.records import RecordTemplate
+import logging
+logger = logging.getLogger(__name__)
+
+
+class OffsetState:
+    """
+    Per-file checkpoints (byte offset and file identity) of an incremental
+    parser, optionally persisted to a small JSON file that is replaced
+    atomically on every save.
+    """
+    def __init__(self, state_path=None):
+        self.state_path = Path(state_path) if state_path else None
+        self._files = {}
+        if self.state_path is not None and self.state_path.exists():
+            self._files = json.loads(self.state_path.read_text())
+
+    def get(self, path):
+        return self._files.get(str(path))
+
+    def set(self, path, offset, inode):
+        self._files[str(path)] = {"offset": int(offset), "inode": int(inode)}
+
+    def save(self):
+        if self.state_path is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(f"{self.state_path.name}.tmp-{os.getpid()}")
+        tmp.write_text(json.dumps(self._files))
+        os.replace(tmp, self.state_path)  # atomic
+
+
+class IncrementalParser:
+    """
+    Extracts records (see RecordTemplate) from growing files, reading only
+    the bytes appended since the previous poll. Only complete lines are
+    parsed, and the last lines that could still be the beginning of a
+    multi-line record are read again on the next poll. A file that shrank
+    or was replaced is parsed again from the start.
+    """
+    def __init__(self, template, state_path=None, types=None, batch_size=65536):
+        self.template = template if isinstance(template, RecordTemplate) else RecordTemplate.from_file(template)
+        self.state = OffsetState(state_path)
+        self.types = types
+        self.batch_size = batch_size
+        # lines of a record that may precede its last one
+        text = self.template.text
+        self._carry_lines = text.count("\n") - (1 if text.endswith("\n") else 0)
+
+    def poll(self, path) -> pa.Table:
+        """Return the records appended to `path` since the last poll."""
+        empty = self.template.schema(self.types).empty_table()
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return empty
+
+        checkpoint = self.state.get(path)
+        offset = 0
+        if checkpoint and checkpoint["inode"] == st.st_ino and checkpoint["offset"] <= st.st_size:
+            offset = checkpoint["offset"]
+        if st.st_size == offset:
+            return empty
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(st.st_size - offset)
+        complete = data[:data.rfind(b"\n") + 1]
+        if not complete:
+            return empty
+
+        match_ends = [0]
+        batches = list(self.template.iter_batches(complete, types=self.types, batch_size=self.batch_size,
+                                                  on_advance=match_ends.append))
+        # resume after the last record, or where an unfinished one may start
+        consumed = max(match_ends[-1], self._carry_start(complete))
+
+        self.state.set(path, offset + consumed, st.st_ino)
+        self.state.save()
+        return pa.Table.from_batches(batches, schema=self.template.schema(self.types))
+
+    def _carry_start(self, complete):
+        """Offset of the first of the last `_carry_lines` lines of `complete`."""
+        pos = len(complete) - 1  # the final newline
+        for _ in range(self._carry_lines):
+            pos = complete.rfind(b"\n", 0, pos)
+            if pos < 0:
+                return 0
+        return pos + 1
+
+
+class Inotify:
+    """Minimal ctypes binding to Linux inotify, used to wake up on file changes."""
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched = set()
+
+    def watch(self, directory):
+        directory = os.path.abspath(directory)
+        if directory in self._watched:
+            return
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if self._libc.inotify_add_watch(self.fd, directory.encode(), mask) < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self._watched.add(directory)
+
+    def wait(self, timeout):
+        """Block until an event arrives or `timeout` seconds pass; drain the queue."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def follow(parser, paths, interval=1.0, use_inotify=True, stop=None):
+    """
+    Poll `paths` with `parser` forever (or until `stop()` returns True) and
+    yield (path, table) whenever records were appended. Waits on inotify
+    events for the files' directories where available and falls back to
+    sleeping `interval` seconds; inotify waits also time out after
+    `interval`, since it does not see writes made by other NFS/Lustre
+    clients.
+    """
+    notifier = None
+    if use_inotify:
+        try:
+            notifier = Inotify()
+            for path in paths:
+                notifier.watch(os.path.dirname(os.path.abspath(path)))
+        except OSError as e:
+            logger.info(f"inotify unavailable, polling every {interval}s: {e}")
+            if notifier is not None:
+                notifier.close()
+            notifier = None
+    try:
+        while True:
+            for path in paths:
+                table = parser.poll(path)
+                if table.num_rows:
+                    yield path, table
+            if stop is not None and stop():
+                return
+            if notifier is not None:
+                notifier.wait(interval)
+            else:
+                time.sleep(interval)
+    finally:
+        if notifier is not None:
+            notifier.close()
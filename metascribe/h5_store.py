@@ -11,41 +11,175 @@
 # - Aravind Sankaran
 
 import pandas as pd
-import time
-import os
 import h5py
 import json
+import numpy as np
+import tables
+from .file_lock import FileLock
+
+
+def _dump_json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class _ObjectPack:
+    """
+    Many small string values packed into three appendable nodes under
+    /_objects: `keys` and `values` hold the concatenated utf-8 bytes, and
+    `index` one (key_off, key_len, val_off, val_len) row per put. Writes only
+    append, so the last row for a key wins; the key -> row map is built in
+    memory when the pack is first used. A row with val_len -1 is a
+    tombstone: the key's newest value is stored outside the pack.
+    """
+    group = "/_objects"
+    # Skip reading the whole span of a multi-get if it is larger than this.
+    max_span = 64 << 20
+
+    class _Row(tables.IsDescription):
+        key_off = tables.Int64Col(pos=0)
+        key_len = tables.Int64Col(pos=1)
+        val_off = tables.Int64Col(pos=2)
+        val_len = tables.Int64Col(pos=3)
+
+    def __init__(self, handle):
+        self.handle = handle
+        self._keys = self._values = self._index = None
+        if self.group in handle:
+            node = handle.get_node(self.group)
+            self._keys = node._f_get_child("keys")
+            self._values = node._f_get_child("values")
+            self._index = node._f_get_child("index")
+        self._rows = None
+        self._idx = None
+
+    def exists(self):
+        return self._index is not None
+
+    def _create(self):
+        h = self.handle
+        g = h.create_group("/", self.group.lstrip("/"))
+        filters = tables.Filters(complevel=5, complib="blosc:zstd", shuffle=False)
+        self._keys = h.create_earray(g, "keys", tables.UInt8Atom(), (0,), filters=filters,
+                                     chunkshape=(1 << 16,))
+        self._values = h.create_earray(g, "values", tables.UInt8Atom(), (0,), filters=filters,
+                                       chunkshape=(1 << 16,))
+        self._index = h.create_table(g, "index", self._Row, filters=filters,
+                                     expectedrows=1_000_000)
+
+    def rows(self):
+        if self._rows is None:
+            self._rows = {}
+            if self.exists() and self._index.nrows:
+                idx = self._index.read()
+                keys = self._keys.read().tobytes()
+                self._rows = {keys[o:o + n].decode(): i for i, (o, n)
+                              in enumerate(zip(idx["key_off"].tolist(), idx["key_len"].tolist()))}
+                self._idx = idx
+        return self._rows
+
+    def put_many(self, items):
+        if not self.exists():
+            self._create()
+        rows = self.rows()
+        key_off, val_off = self._keys.nrows, self._values.nrows
+        key_buf, val_buf, index = [], [], []
+        for key, value in items:
+            k = key.encode()
+            key_buf.append(k)
+            if value is None:
+                index.append((key_off, len(k), -1, -1))  # tombstone
+            else:
+                v = value.encode()
+                index.append((key_off, len(k), val_off, len(v)))
+                val_buf.append(v)
+                val_off += len(v)
+            key_off += len(k)
+        if not index:
+            return 0
+        # values and keys first, so a crash never leaves index rows
+        # pointing past the data
+        self._values.append(np.frombuffer(b"".join(val_buf), dtype=np.uint8))
+        self._keys.append(np.frombuffer(b"".join(key_buf), dtype=np.uint8))
+        first = self._index.nrows
+        self._index.append(index)
+        self._index.flush()
+
+        new = np.array(index, dtype=self._index.dtype)
+        self._idx = new if self._idx is None else np.concatenate([self._idx, new])
+        for i, key_bytes in enumerate(key_buf):
+            rows[key_bytes.decode()] = first + i
+        return len(index)
+
+    def get_many(self, keys):
+        """Yield (key, value) for the keys that exist."""
+        rows = self.rows()
+        found = [(key, rows[key]) for key in keys if key in rows and self._idx["val_len"][rows[key]] >= 0]
+        if not found:
+            return
+        offs = [(key, int(self._idx["val_off"][r]), int(self._idx["val_len"][r])) for key, r in found]
+        lo = min(o for _, o, _ in offs)
+        hi = max(o + n for _, o, n in offs)
+        if len(offs) > 1 and hi - lo <= self.max_span:
+            span = self._values[lo:hi].tobytes()
+            for key, o, n in offs:
+                yield key, span[o - lo:o - lo + n].decode()
+        else:
+            for key, o, n in offs:
+                yield key, self._values[o:o + n].tobytes().decode()
+
+    def keys(self, prefix=""):
+        rows = self.rows()
+        return sorted(k for k, r in rows.items() if k.startswith(prefix) and self._idx["val_len"][r] >= 0)
+
+    def drop(self, key):
+        """Tombstone `key` if the pack holds a value for it."""
+        r = self.rows().get(key)
+        if r is not None and self._idx["val_len"][r] >= 0:
+            self.put_many([(key, None)])
 
 
 class H5Store:
-    def __init__(self, h5_path, mode='a', lock=False, lock_timeout=300, force_open=False):
+    """
+    DataFrame / JSON store over a single HDF5 file (pandas HDFStore).
+
+    With lock=True, mode 'r' takes a shared fcntl.flock lock on
+    `<h5_path>.lock`, so any number of readers open concurrently and only
+    wait while a writer ('a', 'w', 'r+') holds the exclusive lock. Locks are
+    released by the kernel when the holder exits, so they never go stale.
+
+    compact_objects=True stores put_json/put_string values in one packed
+    key/value dataset (see _ObjectPack) instead of a table node per value.
+    Reads look in the pack first and fall back to per-key nodes, so files
+    written in either mode stay readable.
+    """
+    def __init__(self, h5_path, mode='a', lock=False, lock_timeout=300, force_open=False,
+                 compact_objects=False):
         self.h5_path = h5_path
+        self.compact_objects = compact_objects
+        self._objects = None
         self.lock_path = f"{h5_path}.lock"  # Standard lock naming
         self._store = None
         self.lock = lock
+        self._lock = None
         
-        if force_open and os.path.exists(self.lock_path):
-            os.remove(self.lock_path)
-        
+        # force_open used to clear stale lock files; flock locks cannot go
+        # stale, so it is accepted for compatibility and otherwise ignored.
         if self.lock:
-            t0 = time.time()
-            while True:
-                try:
-                    os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
-                    break
-                except FileExistsError:
-                    if time.time() - t0 > lock_timeout:
-                        raise TimeoutError(f"Lock timeout: {self.lock_path}")
-                    time.sleep(1)  
+            self._lock = FileLock(self.lock_path, shared=(mode == 'r'),
+                                  timeout=lock_timeout).acquire()
                 
         try:
             self._store = pd.HDFStore(h5_path, mode=mode)
         #    self._store = h5py.File(h5_path, mode) 
         except Exception as e:
-            if self.lock and os.path.exists(self.lock_path):
-                os.remove(self.lock_path)
+            self._release_lock()
             raise IOError(f"Could not open HDF5 file at {h5_path}: {e}")
 
+    def _release_lock(self):
+        if self._lock is not None:
+            self._lock.release()
+            self._lock = None
+
     def put_df(self, key: str, df: pd.DataFrame):
         self._store.put(key, df, format='table', data_columns=True)
         
@@ -60,11 +194,59 @@ class H5Store:
         
         return df
 
-    def put_json(self, key: str, obj: dict):
-        json_str = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
-        self._store.put(key, pd.Series([json_str]), format='table', data_columns=True)
-        
-    def get_json(self, key: str) -> dict:
+    def append_df(self, key: str, df: pd.DataFrame, index_columns=None,
+                  min_itemsize=None, expectedrows=None):
+        """
+        Append rows to the table at `key`, creating it on first use.
+
+        Every column is a data column, so select()/iter_df() can filter on it.
+        index_columns get a PyTables index, built once and then kept up to
+        date by PyTables as rows are appended. String columns are sized by
+        the first append unless min_itemsize ({column: chars}) reserves more.
+        expectedrows sizes the table's chunks when it is created.
+        """
+        self._store.append(key, df, format='table', data_columns=True, index=False,
+                           min_itemsize=min_itemsize, expectedrows=expectedrows)
+        if index_columns:
+            table = self._store.get_storer(key).table
+            missing = [c for c in index_columns if not table.colindexed.get(c, False)]
+            if missing:
+                self._store.create_table_index(key, columns=missing, optlevel=6, kind='medium')
+
+    def _check_table(self, key: str):
+        if not key in self._store:
+            raise KeyError(f"Key {key} not found in HDF5 store at {self.h5_path}")
+        if not self._store.get_storer(key).is_table:
+            raise TypeError(f"Data at key {key} is not a table in HDF5 store at {self.h5_path}")
+
+    def select(self, key: str, where=None, columns=None, start=None, stop=None) -> pd.DataFrame:
+        """
+        Read the rows of table `key` matching `where` (a PyTables query such
+        as "ts >= 1700000000 & host == 'n1'"), evaluated inside PyTables on
+        indexed columns where possible, optionally only `columns`.
+        """
+        self._check_table(key)
+        return self._store.select(key, where=where, columns=columns, start=start, stop=stop)
+
+    def iter_df(self, key: str, chunksize: int = 100_000, where=None, columns=None):
+        """Yield table `key` (optionally filtered) as DataFrames of up to `chunksize` rows."""
+        self._check_table(key)
+        yield from self._store.select(key, where=where, columns=columns,
+                                      iterator=True, chunksize=chunksize)
+
+    def _pack(self):
+        if self._objects is None:
+            self._objects = _ObjectPack(self._store._handle)
+        return self._objects
+
+    def _get_object(self, key: str):
+        pack = self._pack()
+        if pack.exists():
+            for _, value in pack.get_many([key]):
+                return value
+        return None
+
+    def _get_series_value(self, key: str):
         if not key in self._store:
             raise KeyError(f"Key {key} not found in HDF5 store at {self.h5_path}")  
         
@@ -73,33 +255,77 @@ class H5Store:
         if not isinstance(series, pd.Series):
             raise TypeError(f"Data at key {key} is not a Series in HDF5 store at {self.h5_path}")
         
-        json_str = series.iloc[0]
-        obj = json.loads(json_str)
+        return series.iloc[0]
+
+    def _put_node(self, key: str, value: str):
+        self._store.put(key, pd.Series([value]), format='table', data_columns=True)
+        # reads look in the pack first: hide an older packed value
+        pack = self._pack()
+        if pack.exists():
+            pack.drop(key)
+
+    def put_json(self, key: str, obj: dict):
+        json_str = _dump_json(obj)
+        if self.compact_objects:
+            self._pack().put_many([(key, json_str)])
+            return
+        self._put_node(key, json_str)
         
-        return obj
+    def get_json(self, key: str) -> dict:
+        json_str = self._get_object(key)
+        if json_str is None:
+            json_str = self._get_series_value(key)
+        return json.loads(json_str)
     
     def put_string(self, key: str, value: str):
-        self._store.put(key, pd.Series([value]), format='table', data_columns=True)
+        if self.compact_objects:
+            self._pack().put_many([(key, value)])
+            return
+        self._put_node(key, value)
         
     def get_string(self, key: str) -> str:
-        if not key in self._store:
-            raise KeyError(f"Key {key} not found in HDF5 store at {self.h5_path}")  
-        
-        series = self._store.get(key)
-        
-        if not isinstance(series, pd.Series):
-            raise TypeError(f"Data at key {key} is not a Series in HDF5 store at {self.h5_path}")
-        
-        value = series.iloc[0]
-        
+        value = self._get_object(key)
+        if value is None:
+            value = self._get_series_value(key)
         return value
+
+    def put_many_json(self, items) -> int:
+        """
+        Store many JSON objects; `items` is a dict or (key, obj) pairs.
+        In compact mode this is one append per dataset.
+        """
+        if isinstance(items, dict):
+            items = items.items()
+        if self.compact_objects:
+            return self._pack().put_many((key, _dump_json(obj)) for key, obj in items)
+        n = 0
+        for key, obj in items:
+            self.put_json(key, obj)
+            n += 1
+        return n
+
+    def get_many_json(self, keys) -> dict:
+        """Fetch many JSON objects; missing keys are left out of the result."""
+        keys = list(keys)
+        out = {}
+        pack = self._pack()
+        if pack.exists():
+            out = {key: json.loads(value) for key, value in pack.get_many(keys)}
+        for key in keys:
+            if key not in out and key in self._store:
+                out[key] = json.loads(self._get_series_value(key))
+        return out
+
+    def object_keys(self, prefix: str = "") -> list:
+        """Sorted keys of the objects in the compact pack starting with `prefix`."""
+        return self._pack().keys(prefix)
     
     def close(self):
+        self._objects = None
         if self._store is not None:
             self._store.close()
-            if self.lock:
-                if os.path.exists(self.lock_path):
-                    os.remove(self.lock_path)    
+            self._store = None
+        self._release_lock()
             
     def __enter__(self):
         return self
@@ -0,0 +1,249 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import json
+import time
+import queue
+import socket
+import threading
+import socketserver
+from metascribe.parser import parse_with_template, TemplateCache
+from metascribe.sql_store import SQLStore
+
+
+def _dump(obj):
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+
+
+class IngestdUnavailable(ConnectionError):
+    """No md-ingestd accepted the connection; nothing was sent."""
+
+
+def send_record(socket_path, request, timeout=60.0) -> dict:
+    """
+    Send one md-store request to the md-ingestd listening on `socket_path`
+    and return its reply, {"ok": True} once the record is committed or
+    {"ok": False, "error": ...}. Raises IngestdUnavailable if no daemon
+    accepts the connection, in which case writing the record some other way
+    is safe. Any other OSError (e.g. no answer within `timeout` seconds)
+    comes after the request was sent, when the daemon may have stored it.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(socket_path))
+        except (FileNotFoundError, ConnectionRefusedError, BlockingIOError) as e:
+            # no socket, a stale one, or a full listen backlog
+            raise IngestdUnavailable(f"No md-ingestd listening on {socket_path}: {e}") from e
+        sock.sendall(_dump(request))
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as f:
+            reply = f.readline()
+    if not reply:
+        raise ConnectionError(f"md-ingestd at {socket_path} closed the connection")
+    return json.loads(reply)
+
+
+class _Pending:
+    __slots__ = ("sql_path", "table", "pk", "row", "error", "done")
+
+    def __init__(self, sql_path, table, pk, row):
+        self.sql_path = sql_path
+        self.table = table
+        self.pk = pk
+        self.row = row
+        self.error = None
+        self.done = threading.Event()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    timeout = 60  # drop clients that connect and never send
+
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(_dump(self.server.ingest.handle(line)))
+                self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    request_queue_size = 1024  # listen() backlog for bursts of job ends
+
+
+class IngestServer:
+    """
+    Local md-store daemon on a Unix domain socket (see send_record).
+
+    Each request is one JSON line {"sql_path", "table", "pk", "kv", and
+    optionally "template", "file", "engine"}. Templates are parsed on the
+    connection's thread with a long-lived TemplateCache, then the row is
+    queued for a single writer thread that keeps one SQLStore per database.
+    Records that arrive while a commit runs are written together by the
+    next one (group commit, up to batch_size records, optionally waiting
+    max_delay seconds for more), grouped by (database, table, pk) into
+    store_many calls. Each client gets its reply after its record is
+    committed. The socket is only accessible to the owner (mode 0600).
+    """
+    def __init__(self, socket_path, batch_size=10_000, max_delay=0.0, cache=None, **pragmas):
+        self.socket_path = str(socket_path)
+        self.batch_size = int(batch_size)
+        self.max_delay = max_delay
+        self.cache = cache if cache is not None else TemplateCache()
+        self.pragmas = pragmas  # passed to SQLStore, e.g. journal_mode="WAL"
+        self.commits = 0
+        self.records = 0
+        self._stores = {}  # sql_path -> SQLStore, used by the writer thread only
+        self._queue = queue.Queue()
+        self._server = None
+        self._threads = []
+
+    def start(self):
+        """Bind the socket and start serving in background threads."""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise IOError(f"md-ingestd is already listening on {self.socket_path}")
+            except ConnectionRefusedError:
+                os.unlink(self.socket_path)  # left behind by a daemon that died
+            finally:
+                probe.close()
+        # server_close() waits for open connections, so no request is
+        # queued after the writer thread was told to stop
+        self._server = _Server(self.socket_path, _Handler)
+        self._server.ingest = self
+        os.chmod(self.socket_path, 0o600)
+        self._threads = [
+            threading.Thread(target=self._write_loop, name="md-ingestd-writer"),
+            threading.Thread(target=self._server.serve_forever, name="md-ingestd-server"),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def handle(self, line) -> dict:
+        """Parse, queue and wait for one request; returns the reply."""
+        try:
+            request = json.loads(line)
+            sql_path, table = request["sql_path"], request["table"]
+            kv = request.get("kv") or {}
+        except (ValueError, KeyError, TypeError) as e:
+            return {"ok": False, "error": f"Malformed request: {e}"}
+
+        row = {}
+        if request.get("template") and request.get("file"):
+            try:
+                row = parse_with_template(request["template"], request["file"], cache=self.cache,
+                                          engine=request.get("engine", "regex"))
+            except Exception as e:
+                return {"ok": False, "error": f"Error parsing files: {e}"}
+        row.update(kv)
+        if not row:
+            return {"ok": False, "error": "No data provided to store."}
+
+        pending = _Pending(sql_path, table, request.get("pk"), row)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            return {"ok": False, "error": pending.error}
+        return {"ok": True}
+
+    # ---------- writer thread ----------
+    def _next_batch(self):
+        """Block for one record, then take what is queued (None = stop)."""
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return batch
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            try:
+                wait = deadline - time.monotonic()
+                item = self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is None:
+                break
+        return batch
+
+    def _store(self, sql_path):
+        store = self._stores.get(sql_path)
+        if store is None:
+            store = SQLStore(sql_path, **self.pragmas)
+            if store.cursor is None:
+                return None  # SQLStore printed why; retried on the next record
+            self._stores[sql_path] = store
+        return store
+
+    def _store_rows(self, sql_path, table, pk, items):
+        """Store the rows of `items` in one transaction; returns an error or None."""
+        try:
+            store = self._store(sql_path)
+            # a single batch: store_many rolls it back as a whole on an error
+            stored = 0 if store is None else store.store_many(
+                table, [p.row for p in items], pk=pk, batch_size=len(items))
+        except Exception as e:
+            return str(e)
+        if stored != len(items):
+            # SQLStore printed the database error to the daemon's log
+            return f"Could not store {len(items)} record(s) in '{table}' at {sql_path}"
+        self.commits += 1
+        self.records += stored
+        return None
+
+    def _commit(self, batch):
+        groups = {}
+        for pending in batch:
+            groups.setdefault((pending.sql_path, pending.table, pending.pk), []).append(pending)
+        for key, items in groups.items():
+            error = self._store_rows(*key, items)
+            if error is not None and len(items) > 1:
+                # one bad record must not fail the others: retry them one by
+                # one, so only the records that fail on their own report it
+                for p in items:
+                    p.error = self._store_rows(*key, [p])
+            elif error is not None:
+                items[0].error = error
+            for p in items:
+                p.done.set()
+
+    def _write_loop(self):
+        try:
+            while True:
+                batch = self._next_batch()
+                stop = batch[-1] is None
+                if stop:
+                    batch.pop()
+                if batch:
+                    self._commit(batch)
+                if stop:
+                    return
+        finally:
+            for store in self._stores.values():
+                store.close()
+            self._stores.clear()
+
+    def close(self):
+        """Stop accepting, commit what is queued, then close the stores."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._queue.put(None)
+        for t in self._threads:
+            t.join()
+        self._server = None
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
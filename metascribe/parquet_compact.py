@@ -0,0 +1,179 @@
+import os
+import time
+import shutil
+from pathlib import Path
+import duckdb
+import pyarrow.parquet as pq
+from .parquet_store import (MANIFEST, load_manifest, make_writer_id, partitions,
+                            object_fields, schema_fingerprint, _write_json_atomic)
+from .file_lock import FileLock
+
+# Output rows, sorted by key. Objects keep only the newest ts per key.
+_QUERIES = {
+    "tables": """
+        SELECT * FROM read_parquet(?, union_by_name=true, hive_partitioning=false)
+        ORDER BY key, "row"
+    """,
+    "objects": """
+        SELECT * FROM read_parquet(?, union_by_name=true, hive_partitioning=false)
+        QUALIFY row_number() OVER (PARTITION BY key ORDER BY ts DESC) = 1
+        ORDER BY key
+    """,
+}
+
+
+def _purge(dataset_dir: Path, grace_period: float, now: float) -> int:
+    """
+    Delete shards that a compaction replaced more than grace_period ago
+    (readers that listed files before the swap may still be reading them),
+    then writer directories left without shards and idle as long.
+    """
+    deleted = 0
+    for writer_dir in dataset_dir.glob("writer=*"):
+        manifest = load_manifest(writer_dir)
+        if not manifest.get("replaces") or now - manifest.get("created", now) < grace_period:
+            continue
+        for rel in manifest["replaces"]:
+            path = dataset_dir / rel
+            if path.exists():
+                path.unlink()
+                deleted += 1
+
+    for writer_dir in list(dataset_dir.glob("writer=*")) + list(dataset_dir.glob(".compact-*")):
+        if any(writer_dir.glob("shard-*.parquet")) and not writer_dir.name.startswith("."):
+            continue
+        newest = max([writer_dir.stat().st_mtime] + [f.stat().st_mtime for f in writer_dir.iterdir()])
+        if now - newest >= grace_period:
+            # An idle writer recreates its directory on the next flush.
+            shutil.rmtree(writer_dir, ignore_errors=True)
+    return deleted
+
+
+def _select_inputs(dataset_dir: Path, min_age: float, target_shard_rows: int, now: float):
+    writers = [(d, load_manifest(d)) for d in sorted(dataset_dir.glob("writer=*"))]
+    replaced = set()
+    for _, manifest in writers:
+        replaced.update(manifest.get("replaces", ()))
+
+    inputs, replaces = [], set()
+    for writer_dir, manifest in writers:
+        rows = {e["file"]: e["rows"] for e in manifest.get("shards", ())}
+        for f in sorted(writer_dir.glob("shard-*.parquet")):
+            rel = f"{writer_dir.name}/{f.name}"
+            if rel in replaced or now - f.stat().st_mtime < min_age:
+                continue
+            n = rows.get(f.name)
+            if n is None:
+                n = pq.ParquetFile(f).metadata.num_rows
+            if n >= target_shard_rows // 2:
+                continue  # already large
+            inputs.append(f)
+            replaces.add(rel)
+            # Carry over what an earlier compaction replaced, so the exclusion
+            # survives that compaction's directory being purged.
+            replaces.update(manifest.get("replaces", ()))
+    return inputs, replaces
+
+
+def compact_dataset(dataset_dir, dataset: str, min_age: float = 300, grace_period: float = 3600,
+                    target_shard_rows: int = 5_000_000, row_group_rows: int = 131_072,
+                    now: float = None) -> dict:
+    """
+    Merge the small shards of one dataset ("tables" or "objects") directory
+    into large key-sorted shards under a new writer=compact-<id> directory.
+    Each schema=<fingerprint> partition of tables is compacted on its own,
+    see compact().
+
+    The output is built in a hidden directory and renamed into place, and
+    its manifest lists the input shards under "replaces"; readers switch to
+    the compacted shards at that rename and never see partial output.
+    Inputs are deleted by a later run once grace_period has passed. Shards
+    younger than min_age are left alone, so writers can keep appending.
+    """
+    dataset_dir = Path(dataset_dir)
+    now = time.time() if now is None else now
+    stats = {"inputs": 0, "outputs": 0, "rows": 0, "deleted": 0}
+    if not dataset_dir.exists():
+        return stats
+
+    lock = FileLock(str(dataset_dir / ".compact.lock"), timeout=0)
+    try:
+        lock.acquire()
+    except TimeoutError:
+        return stats  # another compactor is running
+    try:
+        stats["deleted"] = _purge(dataset_dir, grace_period, now)
+        inputs, replaces = _select_inputs(dataset_dir, min_age, target_shard_rows, now)
+        if len(inputs) < 2:
+            return stats
+
+        out_id = f"compact-{make_writer_id()}"
+        tmp_dir = dataset_dir / f".{out_id}"
+        tmp_dir.mkdir()
+        entries = _write_sorted_shards(tmp_dir, _QUERIES[dataset], inputs,
+                                       target_shard_rows, row_group_rows)
+        if dataset == "objects":
+            for e in entries:
+                e["fields"] = object_fields(pq.read_schema(tmp_dir / e["file"]))
+        _write_json_atomic(tmp_dir / MANIFEST, {
+            "writer": out_id,
+            "created": time.time(),
+            "shards": entries,
+            "replaces": sorted(replaces),
+        })
+        os.rename(tmp_dir, dataset_dir / f"writer={out_id}")  # atomic swap
+
+        stats.update(inputs=len(inputs), outputs=len(entries),
+                     rows=sum(e["rows"] for e in entries))
+        return stats
+    finally:
+        lock.release()
+
+
+def _write_sorted_shards(out_dir: Path, query: str, inputs, target_shard_rows, row_group_rows):
+    con = duckdb.connect()
+    result = con.execute(query, [[str(f) for f in inputs]])
+    # to_arrow_reader replaces fetch_record_batch in newer duckdb releases
+    fetch = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+    reader = fetch(row_group_rows)
+
+    entries = []
+    writer = None
+    entry = None
+
+    def finish():
+        writer.close()
+        entry["bytes"] = (out_dir / entry["file"]).stat().st_size
+        entries.append(entry)
+
+    for batch in reader:
+        if batch.num_rows == 0:
+            continue
+        if writer is None or entry["rows"] >= target_shard_rows:
+            if writer is not None:
+                finish()
+            name = f"shard-{len(entries) + 1:06d}.parquet"
+            writer = pq.ParquetWriter(out_dir / name, batch.schema, compression="zstd")
+            entry = {"file": name, "key_min": batch.column("key")[0].as_py(), "rows": 0,
+                     "schema": schema_fingerprint(batch.schema)}
+        writer.write_batch(batch, row_group_size=row_group_rows)
+        entry["rows"] += batch.num_rows
+        entry["key_max"] = batch.column("key")[-1].as_py()
+    if writer is not None:
+        finish()
+    con.close()
+    return entries
+
+
+def compact(store_root: str, datasets=("tables", "objects"), **kwargs) -> dict:
+    """Compact each dataset of a ParquetStoreWriter store; see compact_dataset."""
+    root = Path(store_root)
+    stats = {}
+    for name in datasets:
+        # schema partitions are compacted separately, so outputs stay dense
+        total = {"inputs": 0, "outputs": 0, "rows": 0, "deleted": 0}
+        for _, part in partitions(root / name):
+            for k, v in compact_dataset(part, name, **kwargs).items():
+                total[k] += v
+        stats[name] = total
+    return stats
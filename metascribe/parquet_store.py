@@ -6,40 +6,292 @@ import pyarrow.parquet as pq
 import duckdb, json
 import pandas as pd
 import socket
+import hashlib
+import queue
+import threading
+
+# Per writer directory: one entry per committed shard with its key range,
+# so readers can skip shards (and their footers) that cannot match.
+MANIFEST = "_manifest.json"
+# tables/_schemas/<fingerprint>.json: columns of each schema=<fingerprint>
+# partition of the tables dataset.
+SCHEMA_REGISTRY = "_schemas"
+# Columns every objects shard has; shredded fields are stored next to them.
+OBJECT_COLUMNS = ("key", "kind", "ts", "json")
+FIELD_TYPES = {
+    "string": pa.string(),
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "bool": pa.bool_(),
+}
 
 
 def make_writer_id():
     host = socket.gethostname()
     return f"{time.strftime('%Y%m%dT%H%M%S')}-{host}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
 
+def schema_fingerprint(schema: pa.Schema) -> str:
+    return hashlib.sha1(schema.remove_metadata().serialize().to_pybytes()).hexdigest()[:16]
+
+
+def table_schema(df: pd.DataFrame) -> pa.Schema:
+    """Arrow schema a (key, row, ...) frame is stored with."""
+    return pa.Schema.from_pandas(df, preserve_index=False).remove_metadata()
+
+
+def load_schema_registry(tables_dir) -> dict:
+    """{fingerprint: [(column, arrow type), ...]} of the schema partitions."""
+    registry = {}
+    for f in sorted((Path(tables_dir) / SCHEMA_REGISTRY).glob("*.json")):
+        entry = json.loads(f.read_text())
+        registry[entry["schema"]] = [tuple(c) for c in entry["columns"]]
+    return registry
+
+
+def _field_value(obj, path: str, type_name: str):
+    """
+    Value at dotted `path` in obj, or None if missing or not of type_name
+    (including numbers out of range for int64 / float64).
+    """
+    for part in path.split("."):
+        if not isinstance(obj, dict) or part not in obj:
+            return None
+        obj = obj[part]
+    if type_name == "string":
+        return obj if isinstance(obj, str) else None
+    if type_name == "bool":
+        return obj if isinstance(obj, bool) else None
+    if isinstance(obj, bool):
+        return None
+    if type_name == "int64":
+        return obj if isinstance(obj, int) and -2**63 <= obj < 2**63 else None
+    if not isinstance(obj, (int, float)):
+        return None
+    try:
+        return float(obj)
+    except OverflowError:
+        return None
+
+
+def object_fields(schema: pa.Schema) -> list:
+    """Shredded field columns of an objects shard schema."""
+    return [name for name in schema.names if name not in OBJECT_COLUMNS]
+
+
+def _write_json_atomic(path: Path, obj):
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    tmp.write_text(json.dumps(obj, indent=1))
+    os.replace(tmp, path)  # atomic
+
+
+def load_manifest(writer_dir) -> dict:
+    """Manifest of one writer=* directory ({} for legacy writers)."""
+    try:
+        return json.loads((Path(writer_dir) / MANIFEST).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _next_shard_id(shard_dir: Path, entries) -> int:
+    # Continue numbering when a writer id is reused, so shard names (which
+    # compaction manifests refer to) are never recycled.
+    names = {e["file"] for e in entries} | {f.name for f in shard_dir.glob("shard-*.parquet")}
+    ids = [int(n[len("shard-"):].split(".")[0]) for n in names]
+    return max(ids, default=0) + 1
+
+
 class ParquetStoreWriter:
     """
     Writes two append-only Parquet datasets:
-      - tables: homogeneous DF rows with (key, row, <cols...>)
-      - objects: nested dicts stored as JSON strings with (key, json, kind, ts)
+      - tables: homogeneous DF rows with (key, row, <cols...>), partitioned
+        by schema as tables/schema=<fingerprint>/writer=<id>/ so every shard
+        is dense; columns per fingerprint are kept in tables/_schemas/
+      - objects: nested dicts stored as JSON strings with (key, json, kind, ts),
+        plus one typed column per object_fields entry ({dotted path: type
+        name from FIELD_TYPES}, e.g. {"model.type": "string"}) holding the
+        value at that path, or null where it is missing or of another type
     Each process gets its own writer id -> no shared writable files -> multi-writer safe.
+    Shards are sorted by key and listed in the writer's _manifest.json with
+    their key range, so readers can prune by prefix.
+
+    A buffer is flushed to a shard when it reaches its row count, or
+    max_buffer_bytes, or once its oldest entry is max_buffer_age seconds old
+    (checked on every add, and by the flush thread when there is one).
+    With background=True, full buffers are swapped out and compressed on a
+    flush thread while callers keep appending; at most max_pending buffers
+    wait for it, after which add_table/put_object block (backpressure).
+    Errors from the flush thread are raised by the next call. close() waits
+    for all pending shards.
     """
     def __init__(self, store_root: str, writer_id=None,
                  table_shard_rows=5_000_000,
-                 obj_shard_rows=1_000_000):
+                 obj_shard_rows=1_000_000,
+                 row_group_rows=131_072,
+                 max_buffer_bytes=None,
+                 max_buffer_age=None,
+                 background=False,
+                 max_pending=2,
+                 object_fields=None):
         self.root = Path(store_root)
         self.writer_id = writer_id or make_writer_id()
 
-        self.tables_dir = self.root / "tables" / f"writer={self.writer_id}"
+        self.tables_root = self.root / "tables"
         self.objects_dir = self.root / "objects" / f"writer={self.writer_id}"
-        self.tables_dir.mkdir(parents=True, exist_ok=True)
         self.objects_dir.mkdir(parents=True, exist_ok=True)
 
         self.table_shard_rows = int(table_shard_rows)
         self.obj_shard_rows = int(obj_shard_rows)
 
-        self._table_buf = []
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_buffer_age = max_buffer_age
+
+        self.object_fields = dict(object_fields or {})
+        for path, type_name in self.object_fields.items():
+            if path in OBJECT_COLUMNS:
+                raise ValueError(f"Object field {path!r} clashes with a built-in column")
+            if type_name not in FIELD_TYPES:
+                raise ValueError(f"Unknown type {type_name!r} for object field {path!r}; "
+                                 f"expected one of {sorted(FIELD_TYPES)}")
+        self._obj_schema = pa.schema(
+            [("key", pa.string()), ("kind", pa.string()), ("ts", pa.float64()), ("json", pa.string())]
+            + [(path, FIELD_TYPES[t]) for path, t in self.object_fields.items()])
+
+        self._table_buf = {}  # schema fingerprint -> frames
         self._table_buf_rows = 0
+        self._table_buf_bytes = 0
+        self._table_buf_since = None
         self._obj_buf = []
         self._obj_buf_rows = 0
+        self._obj_buf_bytes = 0
+        self._obj_buf_since = None
+
+        self.row_group_rows = int(row_group_rows)
+        self._manifests = {}
+        self._table_shard_ids = {}  # schema writer dir -> next shard id
+        self._schemas = {}  # fingerprint -> schema, registered by this writer
+        self._obj_shard_id = _next_shard_id(self.objects_dir, self._manifest_entries(self.objects_dir))
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._error = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True,
+                                            name=f"parquet-flush-{self.writer_id}")
+            self._thread.start()
+
+    def _manifest_entries(self, shard_dir: Path):
+        if shard_dir not in self._manifests:
+            self._manifests[shard_dir] = load_manifest(shard_dir).get("shards", [])
+        return self._manifests[shard_dir]
+
+    def table_dir(self, fingerprint: str) -> Path:
+        return self.tables_root / f"schema={fingerprint}" / f"writer={self.writer_id}"
+
+    def _register_schema(self, fingerprint: str, schema: pa.Schema):
+        # Written once per schema, before its first shard.
+        path = self.tables_root / SCHEMA_REGISTRY / f"{fingerprint}.json"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_json_atomic(path, {"schema": fingerprint,
+                                      "columns": [[f.name, str(f.type)] for f in schema]})
+
+    def _write_shard(self, shard_dir: Path, shard_id: int, table: pa.Table):
+        """Write one key-sorted shard, then commit it to the manifest."""
+        # The compactor removes writer directories that have gone idle.
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        tmp = shard_dir / f"shard-{shard_id:06d}.parquet.tmp-{os.getpid()}"
+        final = shard_dir / f"shard-{shard_id:06d}.parquet"
+        pq.write_table(table, tmp, compression="zstd", row_group_size=self.row_group_rows)
+        os.replace(tmp, final)  # atomic
+
+        # A crash between the two renames leaves a shard missing from the
+        # manifest; readers always open such shards, so nothing is lost.
+        keys = table.column("key")
+        entries = self._manifest_entries(shard_dir)
+        entries.append({
+            "file": final.name,
+            "key_min": keys[0].as_py(),
+            "key_max": keys[-1].as_py(),
+            "rows": table.num_rows,
+            "bytes": final.stat().st_size,
+            "schema": schema_fingerprint(table.schema),
+        })
+        if shard_dir == self.objects_dir:
+            # lets readers skip shards without a filtered field unopened
+            entries[-1]["fields"] = object_fields(table.schema)
+        _write_json_atomic(shard_dir / MANIFEST, {"writer": self.writer_id, "shards": entries})
+
+    # ---------- FLUSHING ----------
+    def _aged(self, since):
+        return (self.max_buffer_age is not None and since is not None
+                and time.monotonic() - since >= self.max_buffer_age)
+
+    def _due(self, rows, nbytes, since, shard_rows):
+        return (rows >= shard_rows
+                or (self.max_buffer_bytes is not None and nbytes >= self.max_buffer_bytes)
+                or self._aged(since))
+
+    def _write_tables(self, shards):
+        # one dense shard per schema: frames of a schema concat without nulls
+        for fingerprint, shard_id, frames in shards:
+            schema = self._schemas[fingerprint]
+            self._register_schema(fingerprint, schema)
+            big = pd.concat(frames, ignore_index=True)
+            table = pa.Table.from_pandas(big, schema=schema, preserve_index=False)
+            table = table.sort_by([("key", "ascending"), ("row", "ascending")])
+            self._write_shard(self.table_dir(fingerprint), shard_id, table)
+
+    def _write_objects(self, shard_id, rows):
+        if self.object_fields:
+            table = pa.Table.from_pylist(rows, schema=self._obj_schema)
+        else:
+            table = pa.Table.from_pandas(pd.DataFrame(rows), preserve_index=False)
+        table = table.sort_by([("key", "ascending"), ("ts", "ascending")])
+        self._write_shard(self.objects_dir, shard_id, table)
 
-        self._table_shard_id = 1
-        self._obj_shard_id = 1
+    def _submit(self, job, inline=False):
+        if self._queue is None or inline:
+            job[0](*job[1:])
+        else:
+            # enqueue first: the rows are already swapped out of the buffer
+            self._queue.put(job)  # blocks while max_pending buffers are queued
+            self._raise_flush_error()
+
+    def _flush_loop(self):
+        tick = self.max_buffer_age / 4 if self.max_buffer_age else None
+        while True:
+            try:
+                job = self._queue.get(timeout=tick)
+            except queue.Empty:
+                # Idle producer: age out buffers from here.
+                self._flush_aged()
+                continue
+            try:
+                if job is None:
+                    return
+                job[0](*job[1:])
+            except BaseException as e:
+                if self._error is None:
+                    self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _flush_aged(self):
+        try:
+            if self._aged(self._table_buf_since):
+                self.flush_tables(_inline=True)
+            if self._aged(self._obj_buf_since):
+                self.flush_objects(_inline=True)
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+
+    def _raise_flush_error(self):
+        if self._error is not None:
+            e, self._error = self._error, None
+            raise IOError(f"Background flush failed in {self.root}: {e}") from e
 
     # ---------- TABLES ----------
     def add_table(self, key: str, df: pd.DataFrame):
@@ -49,25 +301,39 @@ class ParquetStoreWriter:
         df2 = df.copy()
         df2.insert(0, "key", key)
         df2.insert(1, "row", range(len(df2)))
-        self._table_buf.append(df2)
-        self._table_buf_rows += len(df2)
-
-        if self._table_buf_rows >= self.table_shard_rows:
+        nbytes = int(df2.memory_usage(index=False, deep=True).sum())
+        schema = table_schema(df2)
+        fingerprint = schema_fingerprint(schema)
+        with self._lock:
+            self._schemas.setdefault(fingerprint, schema)
+            self._table_buf.setdefault(fingerprint, []).append(df2)
+            self._table_buf_rows += len(df2)
+            self._table_buf_bytes += nbytes
+            if self._table_buf_since is None:
+                self._table_buf_since = time.monotonic()
+            due = self._due(self._table_buf_rows, self._table_buf_bytes,
+                            self._table_buf_since, self.table_shard_rows)
+        if due:
             self.flush_tables()
 
-    def flush_tables(self):
-        if not self._table_buf:
-            return
-        big = pd.concat(self._table_buf, ignore_index=True)
-        table = pa.Table.from_pandas(big, preserve_index=False)
-
-        tmp = self.tables_dir / f"shard-{self._table_shard_id:06d}.parquet.tmp-{os.getpid()}"
-        final = self.tables_dir / f"shard-{self._table_shard_id:06d}.parquet"
-        pq.write_table(table, tmp, compression="zstd")
-        os.replace(tmp, final)  # atomic
-        self._table_buf.clear()
-        self._table_buf_rows = 0
-        self._table_shard_id += 1
+    def flush_tables(self, _inline=False):
+        with self._lock:
+            if not self._table_buf:
+                return
+            # swap buffers: callers append to a fresh one while this one is written
+            shards = []
+            for fingerprint, frames in self._table_buf.items():
+                shard_dir = self.table_dir(fingerprint)
+                if shard_dir not in self._table_shard_ids:
+                    self._table_shard_ids[shard_dir] = _next_shard_id(
+                        shard_dir, self._manifest_entries(shard_dir))
+                shards.append((fingerprint, self._table_shard_ids[shard_dir], frames))
+                self._table_shard_ids[shard_dir] += 1
+            self._table_buf = {}
+            self._table_buf_rows = 0
+            self._table_buf_bytes = 0
+            self._table_buf_since = None
+        self._submit((self._write_tables, shards), inline=_inline)
 
     # ---------- OBJECTS (nested dicts / JSON) ----------
     def put_object(self, key: str, obj: dict, kind: str = "json", ts: float = None):
@@ -77,66 +343,399 @@ class ParquetStoreWriter:
         if ts is None:
             ts = time.time()
 
-        self._obj_buf.append({
+        json_str = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        row = {
             "key": key,
             "kind": kind,
             "ts": float(ts),
-            "json": json.dumps(obj, ensure_ascii=False, separators=(",", ":")),
-        })
-        self._obj_buf_rows += 1
-
-        if self._obj_buf_rows >= self.obj_shard_rows:
+            "json": json_str,
+        }
+        for path, type_name in self.object_fields.items():
+            row[path] = _field_value(obj, path, type_name)
+        with self._lock:
+            self._obj_buf.append(row)
+            self._obj_buf_rows += 1
+            self._obj_buf_bytes += len(key) + len(kind) + len(json_str) + 8 + 8 * len(self.object_fields)
+            if self._obj_buf_since is None:
+                self._obj_buf_since = time.monotonic()
+            due = self._due(self._obj_buf_rows, self._obj_buf_bytes,
+                            self._obj_buf_since, self.obj_shard_rows)
+        if due:
             self.flush_objects()
 
-    def flush_objects(self):
-        if not self._obj_buf:
+    def flush_objects(self, _inline=False):
+        with self._lock:
+            if not self._obj_buf:
+                return
+            rows, shard_id = self._obj_buf, self._obj_shard_id
+            self._obj_buf = []
+            self._obj_buf_rows = 0
+            self._obj_buf_bytes = 0
+            self._obj_buf_since = None
+            self._obj_shard_id += 1
+        self._submit((self._write_objects, shard_id, rows), inline=_inline)
+
+    def close(self):
+        try:
+            try:
+                self.flush_tables()
+            finally:
+                self.flush_objects()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+                self._queue = None
+        self._raise_flush_error()
+        
+
+
+def _may_contain(entry, prefix: str) -> bool:
+    # Some key in [key_min, key_max] can start with prefix.
+    key_min, key_max = entry.get("key_min"), entry.get("key_max")
+    if key_min is None or key_max is None:
+        return True
+    return key_max >= prefix and (key_min < prefix or key_min.startswith(prefix))
+
+
+def _live_shards(dataset_dir):
+    """(path, manifest entry or None) of every shard not replaced by a compaction."""
+    writers = [(d, load_manifest(d)) for d in sorted(Path(dataset_dir).glob("writer=*"))]
+    replaced = set()
+    for _, manifest in writers:
+        replaced.update(manifest.get("replaces", ()))
+
+    shards = []
+    for writer_dir, manifest in writers:
+        listed = {e["file"]: e for e in manifest.get("shards", ())}
+        for f in sorted(writer_dir.glob("shard-*.parquet")):
+            if f"{writer_dir.name}/{f.name}" not in replaced:
+                shards.append((str(f), listed.get(f.name)))
+    return shards
+
+
+def partitions(dataset_dir):
+    """
+    (schema fingerprint, directory) of each partition holding writer=* dirs:
+    the dataset directory itself (objects, and tables written before schema
+    partitioning, fingerprint None) and every schema=<fingerprint> below it.
+    """
+    dataset_dir = Path(dataset_dir)
+    parts = [(None, dataset_dir)]
+    for d in sorted(dataset_dir.glob("schema=*")):
+        parts.append((d.name[len("schema="):], d))
+    return parts
+
+
+def _prune(shards, prefix: str):
+    return [path for path, entry in shards if entry is None or _may_contain(entry, prefix)]
+
+
+def shard_files(dataset_dir, prefix: str = ""):
+    """
+    Shards under dataset_dir/[schema=*/]writer=* that may hold keys starting
+    with `prefix`. Shards a manifest does not list (older writers, or a
+    crash before the manifest was updated) are always included; shards that
+    a compaction manifest lists under "replaces" never are.
+    """
+    files = []
+    for _, part in partitions(dataset_dir):
+        files.extend(_prune(_live_shards(part), prefix))
+    return files
+
+
+def _decode_json_column(column) -> list:
+    # One json.loads over a joined array instead of one call per row.
+    return json.loads("[" + ",".join(column.to_pylist()) + "]")
+
+
+_FILTER_OPS = {"==": "=", "!=": "<>", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "in": "IN"}
+
+
+def _where(filters):
+    """SQL conjunction and its parameters for [(column, op, value), ...]."""
+    clauses, params = [], []
+    for column, op, value in filters:
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Unknown filter operator {op!r}; expected one of {sorted(_FILTER_OPS)}")
+        name = '"' + column.replace('"', '""') + '"'
+        if op == "in":
+            value = list(value)
+            clauses.append(f"{name} IN ({', '.join('?' * len(value))})" if value else "false")
+            params.extend(value)
+        else:
+            clauses.append(f"{name} {_FILTER_OPS[op]} ?")
+            params.append(value)
+    return " AND ".join(clauses) or "true", params
+
+
+def _read_parquet(fingerprint):
+    # Shards of one schema partition share a schema; only legacy shards
+    # (fingerprint None) need the union.
+    if fingerprint is None:
+        return "read_parquet(?, union_by_name=true, hive_partitioning=false)"
+    return "read_parquet(?, hive_partitioning=false)"
+
+
+class ParquetStoreReader:
+    """
+    Reads a ParquetStoreWriter store through one duckdb connection.
+
+    The shard listing (manifests included) is cached and re-read at most
+    every refresh_interval seconds, or on refresh(); each query only opens
+    the shards whose manifest key range can match. Table queries run per
+    schema partition, so they read dense, correctly typed columns without a
+    union. For ad-hoc SQL, views() adds `tables` and `objects` views over all
+    live shards to the connection.
+
+    Object queries can filter on shredded fields (see the writer's
+    object_fields) with filters=[(column, op, value), ...], all of which must
+    hold; op is one of ==, !=, <, <=, >, >=, in. Filters run inside duckdb on
+    the field columns, using Parquet statistics, so only matching objects
+    are decoded; shards without the filtered fields are never opened.
+    """
+    def __init__(self, store_root: str, refresh_interval: float = 5.0):
+        self.root = Path(store_root)
+        self.refresh_interval = refresh_interval
+        self.con = duckdb.connect()
+        self._shards = {}
+        self._listed_at = None
+        self._shard_fields = {}  # fields of shards missing from a manifest
+        self.refresh()
+
+    def refresh(self):
+        # dataset -> {schema fingerprint: [(path, entry), ...]}
+        self._shards = {name: {fp: _live_shards(part) for fp, part in partitions(self.root / name)}
+                        for name in ("tables", "objects")}
+        self._entries = {path: entry for shards in self._shards["objects"].values()
+                         for path, entry in shards}
+        self._listed_at = time.monotonic()
+
+    def views(self):
+        """
+        Create (or update) the `tables` and `objects` views over all live
+        shards on self.con for ad-hoc SQL, and return the connection. Binding
+        a view opens every shard's footer, so the reader never does this on
+        its own; call views() again after new shards were written.
+        """
+        self.refresh()
+        for name, parts in self._shards.items():
+            files = [path for shards in parts.values() for path, _ in shards]
+            if files:
+                self.con.execute(f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM read_parquet("
+                                 f"{self._sql_list(files)}, union_by_name=true, hive_partitioning=false)")
+            else:
+                self.con.execute(f"DROP VIEW IF EXISTS {name}")
+        return self.con
+
+    def schemas(self) -> dict:
+        """{fingerprint: [(column, arrow type), ...]} for the tables dataset."""
+        return load_schema_registry(self.root / "tables")
+
+    @staticmethod
+    def _sql_list(files):
+        # Views cannot take bound parameters; quote the paths instead.
+        return "[" + ",".join("'" + f.replace("'", "''") + "'" for f in files) + "]"
+
+    def _groups(self, dataset: str, prefix: str, schema=None):
+        """{fingerprint: matching shard paths}, optionally for one schema only."""
+        if time.monotonic() - self._listed_at > self.refresh_interval:
+            self.refresh()
+        groups = {}
+        for fp, shards in self._shards[dataset].items():
+            if schema is not None and fp != schema:
+                continue
+            files = _prune(shards, prefix)
+            if files:
+                groups[fp] = files
+        return groups
+
+    def _files(self, dataset: str, prefix: str):
+        return [f for files in self._groups(dataset, prefix).values() for f in files]
+
+    def _fields(self, path: str):
+        entry = self._entries.get(path)
+        if entry is not None and "fields" in entry:
+            return entry["fields"]
+        if path not in self._shard_fields:
+            self._shard_fields[path] = object_fields(pq.read_schema(path))
+        return self._shard_fields[path]
+
+    def _filtered_files(self, prefix: str, filters, latest: bool):
+        files = self._files("objects", prefix)
+        needed = {c for c, _, _ in filters if c not in OBJECT_COLUMNS}
+        having = [f for f in files if needed <= set(self._fields(f))]
+        if not having:
+            return []
+        # With latest, the newest version of a key must match wherever it is
+        # stored, so every shard takes part in the dedupe.
+        return files if latest else having
+
+    @staticmethod
+    def _filtered_sql(filters, latest: bool, columns: str = "*"):
+        """SQL over `?` (shards) and `?` (prefix) selecting the matching objects."""
+        where, params = _where(filters)
+        source = "read_parquet(?, union_by_name=true, hive_partitioning=false)"
+        if latest:
+            return f"""
+                SELECT {columns} FROM (
+                    SELECT * FROM {source} WHERE starts_with(key, ?)
+                    QUALIFY row_number() OVER (PARTITION BY key ORDER BY ts DESC) = 1
+                ) WHERE {where}""", params
+        return f"SELECT {columns} FROM {source} WHERE starts_with(key, ?) AND {where}", params
+
+    def _execute(self, dataset: str, prefix: str, sql, params=(), per_schema=False, schema=None,
+                 select=None):
+        """
+        Run sql with `?` first bound to the matching shards, once per schema
+        partition if per_schema=True (sql is then a function of the
+        fingerprint), optionally only for partition `schema`. select(prefix)
+        can replace the shard selection. Yields (fingerprint, result).
+        """
+        def execute(query, files, reselect):
+            try:
+                return self.con.execute(query, [files, *params])
+            except duckdb.IOException:
+                # A shard was purged after a compaction since the last listing.
+                self.refresh()
+                files = reselect()
+                return self.con.execute(query, [files, *params]) if files else None
+
+        if per_schema:
+            for fp, files in self._groups(dataset, prefix, schema).items():
+                result = execute(sql(fp), files, lambda: self._groups(dataset, prefix, fp).get(fp))
+                if result is not None:
+                    yield fp, result
+        else:
+            pick = (lambda: select(prefix)) if select else (lambda: self._files(dataset, prefix))
+            files = pick()
+            result = execute(sql, files, pick) if files else None
+            if result is not None:
+                yield None, result
+
+    @staticmethod
+    def _reader(result, batch_size):
+        fetch = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+        return fetch(batch_size)
+
+    def get_object(self, key: str) -> dict:
+        """Newest version of object `key`."""
+        for _, result in self._execute("objects", key, """
+            SELECT json FROM read_parquet(?, union_by_name=true, hive_partitioning=false)
+            WHERE key = ? ORDER BY ts DESC LIMIT 1
+        """, [key]):
+            row = result.fetchone()
+            if row is not None:
+                return json.loads(row[0])
+        raise KeyError(f"Key {key} not found in Parquet store at {self.root}")
+
+    def get_table(self, key: str, schema: str = None) -> pd.DataFrame:
+        """
+        Table stored under `key`. Passing its schema fingerprint (see
+        schemas()) restricts the lookup to that partition's files.
+        """
+        frames = []
+        for _, result in self._execute("tables", key, lambda fp: f"""
+            SELECT * EXCLUDE (key, "row") FROM {_read_parquet(fp)}
+            WHERE key = ? ORDER BY "row"
+        """, [key], per_schema=True, schema=schema):
+            df = result.fetch_df()
+            if not df.empty:
+                frames.append(df)
+        if not frames:
+            raise KeyError(f"Key {key} not found in Parquet store at {self.root}")
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def scan(self, prefix: str = "", dataset: str = "objects", decode: bool = True,
+             latest: bool = False, batch_size: int = 65_536, filters=None):
+        """
+        Lazily scan keys starting with `prefix` in key order.
+
+        For objects with decode=True, yields (key, dict) pairs (every stored
+        version in ts order, or only the newest with latest=True); otherwise
+        yields pyarrow RecordBatches of up to batch_size rows. Objects can be
+        restricted to those matching filters (see the class docstring).
+        Tables are scanned one schema partition at a time, in key order
+        within each. Only one batch is decoded at a time.
+        """
+        if dataset == "tables":
+            results = self._execute("tables", prefix, lambda fp: f"""
+                SELECT * FROM {_read_parquet(fp)}
+                WHERE starts_with(key, ?) ORDER BY key, "row"
+            """, [prefix], per_schema=True)
+            for _, result in results:
+                yield from self._reader(result, batch_size)
             return
-        df = pd.DataFrame(self._obj_buf)
-        table = pa.Table.from_pandas(df, preserve_index=False)
 
-        tmp = self.objects_dir / f"shard-{self._obj_shard_id:06d}.parquet.tmp-{os.getpid()}"
-        final = self.objects_dir / f"shard-{self._obj_shard_id:06d}.parquet"
-        pq.write_table(table, tmp, compression="zstd")
-        os.replace(tmp, final)  # atomic
-        self._obj_buf.clear()
-        self._obj_buf_rows = 0
-        self._obj_shard_id += 1
+        if filters:
+            sql, params = self._filtered_sql(filters, latest)
+            results = self._execute("objects", prefix, sql + " ORDER BY key, ts", [prefix, *params],
+                                    select=lambda p: self._filtered_files(p, filters, latest))
+        else:
+            dedupe = "QUALIFY row_number() OVER (PARTITION BY key ORDER BY ts DESC) = 1" if latest else ""
+            results = self._execute("objects", prefix, f"""
+                SELECT * FROM read_parquet(?, union_by_name=true, hive_partitioning=false)
+                WHERE starts_with(key, ?) {dedupe}
+                ORDER BY key, ts
+            """, [prefix])
+        for _, result in results:
+            for batch in self._reader(result, batch_size):
+                if not decode:
+                    yield batch
+                    continue
+                yield from zip(batch.column("key").to_pylist(), _decode_json_column(batch.column("json")))
+
+    def find(self, filters, prefix: str = "", latest: bool = True) -> list:
+        """
+        Sorted keys under `prefix` whose newest version (any version with
+        latest=False) matches filters, read from the field columns alone:
+        no JSON is loaded or decoded.
+        """
+        sql, params = self._filtered_sql(filters, latest, columns="DISTINCT key")
+        keys = []
+        for _, result in self._execute("objects", prefix, sql + " ORDER BY key", [prefix, *params],
+                                       select=lambda p: self._filtered_files(p, filters, latest)):
+            keys.extend(k for k, in result.fetchall())
+        return keys
+
+    def read_prefix(self, prefix: str):
+        """All tables and objects under `prefix`, as returned by parquet_read."""
+        table_map = {}
+        for _, result in self._execute("tables", prefix, lambda fp: f"""
+            SELECT * FROM {_read_parquet(fp)}
+            WHERE starts_with(key, ?) ORDER BY key, "row"
+        """, [prefix], per_schema=True):
+            table = self._reader(result, 1_000_000).read_all()
+            keys = table.column("key").to_pylist()
+            df = table.drop_columns(["key", "row"]).to_pandas()
+            # rows are sorted by key: slice each key's run instead of groupby
+            start = 0
+            for i in range(1, len(keys) + 1):
+                if i == len(keys) or keys[i] != keys[start]:
+                    table_map[keys[start]] = df.iloc[start:i].reset_index(drop=True)
+                    start = i
+
+        obj_list = []
+        for _, result in self._execute("objects", prefix, """
+            SELECT key, json FROM read_parquet(?, union_by_name=true, hive_partitioning=false)
+            WHERE starts_with(key, ?) ORDER BY ts
+        """, [prefix]):
+            for batch in self._reader(result, 65_536):
+                obj_list.extend(zip(batch.column("key").to_pylist(),
+                                    _decode_json_column(batch.column("json"))))
+        return table_map, obj_list
 
     def close(self):
-        self.flush_tables()
-        self.flush_objects()
-        
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 def parquet_read(store_root: str, prefix: str):
-    con = duckdb.connect()
-
-    # Read matching table rows
-    tables_df = con.execute(f"""
-        SELECT *
-        FROM read_parquet('{store_root}/tables/writer=*/shard-*.parquet')
-        WHERE starts_with(key, '{prefix}')
-    """).fetch_df()
-
-    # Read matching objects
-    objs_df = con.execute(f"""
-        SELECT *
-        FROM read_parquet('{store_root}/objects/writer=*/shard-*.parquet')
-        WHERE starts_with(key, '{prefix}')
-        ORDER BY ts
-    """).fetch_df()
-
-    # Reconstruct small tables: dict[key] -> dataframe (drop key, row)
-    table_map = {}
-    if not tables_df.empty:
-        for k, g in tables_df.groupby("key"):
-            g2 = g.drop(columns=["key"]).sort_values("row").drop(columns=["row"])
-            table_map[k] = g2.reset_index(drop=True)
-
-    # Decode JSON objects: list of (key, dict)
-    obj_list = []
-    if not objs_df.empty:
-        for _, r in objs_df.iterrows():
-            obj_list.append((r["key"], json.loads(r["json"])))
-
-    return table_map, obj_list
+    with ParquetStoreReader(store_root) as reader:
+        return reader.read_prefix(prefix)
@@ -6,6 +6,11 @@
 
 from jinja2 import Template
 import re
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
 import sys
 
@@ -38,26 +43,324 @@ def jinja_to_regex(template_text):
 
     return re.compile(escaped, re.MULTILINE)
 
-def parse_with_template(template_path, result_path):
+def literal_to_regex(literal):
+    """Steps 3 and 5 of jinja_to_regex applied to one literal fragment."""
+    return re.escape(literal).replace(r"\ ", r"\s+").replace(r"\n", r"\s*")
+
+
+def template_segments(template_text):
+    """
+    Split a template into the literal fragments between its placeholders,
+    following the same placeholder rules as jinja_to_regex.
+    Returns (literals, groups) with len(literals) == len(groups) + 1, where
+    groups are the regex group names (``var__i``) in template order.
+    """
+    vars_found = re.findall(r"{{\s*(\w+)\s*}}", template_text)
+
+    tmp_text = template_text
+    for i, var in enumerate(vars_found, 1):
+        tmp_text = tmp_text.replace(f"{{{{ {var} }}}}", f"___VAR_{var}__{i}___", 1)
+
+    # placeholders that were substituted, in text order
+    found = []
+    for i, var in enumerate(vars_found, 1):
+        pos = tmp_text.find(f"___VAR_{var}__{i}___")
+        if pos >= 0:
+            found.append((pos, f"{var}__{i}"))
+    found.sort()
+
+    literals, groups = [], []
+    start = 0
+    for pos, group in found:
+        literals.append(tmp_text[start:pos])
+        groups.append(group)
+        start = pos + len(f"___VAR_{group}___")
+    literals.append(tmp_text[start:])
+    return literals, groups
+
+
+class AnchorMatcher:
+    """
+    Regex-free matching engine. The literal fragments of a template are
+    located in order with ``str.find`` (or a small whitespace-flexible
+    pattern when the fragment contains spaces) and variable values are
+    sliced out between them, so a match or a failure costs a single forward
+    pass over the file.
+
+    It takes the first occurrence of each fragment, which is what the lazy
+    ``[\\s\\S]+?`` groups of the regex engine settle on unless they need
+    to backtrack; a file that cannot be matched this way is reported as a
+    mismatch instead of being searched exhaustively.
+    """
+    # fragments are searched with this much overlap when scanning in windows
+    overlap = 1 << 16
+
+    def __init__(self, literals, groups, encoding=None):
+        self.groups = groups
+        self._finders = [self._finder(lit, encoding) for lit in literals]
+
+    @staticmethod
+    def _finder(literal, encoding):
+        """
+        Return find(text, pos, endpos) -> (start, end, min_end) or None. `min_end`
+        differs from `end` only when the fragment ends in flexible
+        whitespace, which the regex engine may give back to the next group.
+        """
+        pattern = literal_to_regex(literal)
+        if pattern == re.escape(literal):
+            needle = literal.encode(encoding) if encoding else literal
+            size = len(needle)
+
+            def find(text, pos, endpos):
+                start = text.find(needle, pos, endpos)
+                return (start, start + size, start + size) if start >= 0 else None
+            return find
+
+        lazy_tail = None
+        if pattern.endswith((r"\s+", r"\s*")):
+            lazy_tail = pattern.replace(r"\s+", r"\s+?").replace(r"\s*", r"\s*?")
+        if encoding:
+            pattern = pattern.encode(encoding)
+            lazy_tail = lazy_tail.encode(encoding) if lazy_tail else None
+        regex = re.compile(pattern, re.MULTILINE)
+        lazy_regex = re.compile(lazy_tail, re.MULTILINE) if lazy_tail else None
+
+        def find(text, pos, endpos):
+            m = regex.search(text, pos, endpos)
+            if not m:
+                return None
+            start, end = m.span()
+            min_end = lazy_regex.match(text, start).end() if lazy_regex else end
+            return start, end, min_end
+        return find
+
+    def _search(self, find, text, pos, window, on_advance):
+        n = len(text)
+        if window is None:
+            return find(text, pos, n)
+        while True:
+            endpos = min(n, pos + window + self.overlap)
+            span = find(text, pos, endpos)
+            if span is not None or endpos == n:
+                return span
+            pos += window
+            if on_advance is not None:
+                on_advance(pos)
+
+    def spans(self, text, window=None, on_advance=None):
+        """
+        Return [(group, start, end), ...] for a match, or None.
+
+        With `window`, the text is searched `window` characters at a time
+        (fragments must fit in `overlap` to be found across window borders)
+        and `on_advance(offset)` is called as the scan moves past `offset`,
+        so callers can release what lies behind it.
+        """
+        span = self._search(self._finders[0], text, 0, window, on_advance)
+        if span is None:
+            return None
+        result = []
+        for group, find in zip(self.groups, self._finders[1:]):
+            _, pos, min_pos = span
+            # every variable captures at least one character
+            span = self._search(find, text, pos + 1, window, on_advance) if pos < len(text) else None
+            if span is None and min_pos < pos:
+                # the next fragment may only fit inside the whitespace the
+                # previous one consumed: take its last occurrence there,
+                # searching no further than the window the scan started in
+                limit = len(text) if window is None else min(len(text), pos + 1 + window + self.overlap)
+                span = find(text, min_pos + 1, limit)
+                if span is None or span[0] > pos:
+                    return None
+                while True:
+                    later = find(text, span[0] + 1, limit)
+                    if later is None or later[0] > pos:
+                        break
+                    span = later
+                pos = span[0] - 1
+            if span is None:
+                return None
+            result.append((group, pos, span[0]))
+        return result
+
+    def match(self, text, window=None, on_advance=None):
+        spans = self.spans(text, window=window, on_advance=on_advance)
+        if spans is None:
+            return None
+        return {group: text[start:end] for group, start, end in spans}
+
+
+def template_digest(template_text):
+    """Content hash used to key compiled templates."""
+    return hashlib.sha1(template_text.encode("utf-8")).hexdigest()
+
+
+class CompiledTemplate:
+    """
+    A template converted to its extraction regex once, so it can be matched
+    against many rendered files. `groups` maps regex group names
+    (``var__i``) to the variable they capture.
+    """
+    def __init__(self, template_text, pattern=None, groups=None):
+        self.text = template_text
+        self.digest = template_digest(template_text)
+        if pattern is None:
+            regex = jinja_to_regex(template_text)
+            pattern = regex.pattern
+        else:
+            regex = re.compile(pattern, re.MULTILINE)
+        self.pattern = pattern
+        self.regex = regex
+        if groups is None:
+            groups = {g: g.split("__")[0] for g in regex.groupindex}
+        self.groups = groups
+        self._anchor = None
+        self._bytes_regex = None
+        self._bytes_anchor = None
+
+    @property
+    def anchor(self) -> AnchorMatcher:
+        if self._anchor is None:
+            self._anchor = AnchorMatcher(*template_segments(self.text))
+        return self._anchor
+
+    @property
+    def bytes_regex(self):
+        """The extraction regex for UTF-8 encoded input."""
+        if self._bytes_regex is None:
+            self._bytes_regex = re.compile(self.pattern.encode("utf-8"), re.MULTILINE)
+        return self._bytes_regex
+
+    @property
+    def bytes_anchor(self) -> AnchorMatcher:
+        if self._bytes_anchor is None:
+            self._bytes_anchor = AnchorMatcher(*template_segments(self.text), encoding="utf-8")
+        return self._bytes_anchor
+
+    def match(self, result_text, engine="regex", window=None, on_advance=None):
+        """
+        Extract variable values from `result_text`. `engine` is "regex"
+        (backtracking search) or "anchor" (linear-time, see AnchorMatcher).
+
+        `result_text` may also be UTF-8 encoded bytes or any bytes-like
+        object such as an mmap; then only the captured values are decoded.
+        `window` and `on_advance` are passed to the anchor engine.
+        """
+        is_text = isinstance(result_text, str)
+        if engine == "regex":
+            regex = self.regex if is_text else self.bytes_regex
+            match = regex.search(result_text)
+            raw = match.groupdict() if match else None
+        elif engine == "anchor":
+            anchor = self.anchor if is_text else self.bytes_anchor
+            raw = anchor.match(result_text, window=window, on_advance=on_advance)
+        else:
+            raise ValueError(f"Unknown engine '{engine}', expected 'regex' or 'anchor'.")
+        if raw is None:
+            raise ValueError("Could not match template with rendered file.")
+
+        # strip whitespace and handle repeated vars consistently
+        data = {}
+        for k, v in raw.items():
+            if not is_text:
+                v = v.decode("utf-8", errors="replace")
+            data[self.groups[k]] = v.strip()  # last occurrence wins
+        return data
+
+    def to_dict(self):
+        return {"digest": self.digest, "pattern": self.pattern, "groups": self.groups}
+
+
+class TemplateCache:
+    """
+    Bounded in-process LRU of compiled templates keyed by template content
+    hash, optionally backed by a directory of generated patterns so that
+    short-lived processes skip the template-to-regex conversion.
+    """
+    def __init__(self, maxsize=64, cache_dir=None):
+        self.maxsize = int(maxsize)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_text) -> CompiledTemplate:
+        digest = template_digest(template_text)
+        with self._lock:
+            compiled = self._entries.get(digest)
+            if compiled is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = self._load(digest, template_text)
+        if compiled is None:
+            compiled = CompiledTemplate(template_text)
+            self._save(compiled)
+
+        with self._lock:
+            self._entries[digest] = compiled
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def load(self, template_path) -> CompiledTemplate:
+        return self.get(Path(template_path).read_text())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------- on-disk persistence ----------
+    def _entry_path(self, digest):
+        return self.cache_dir / f"{digest}.json"
+
+    def _load(self, digest, template_text):
+        if self.cache_dir is None:
+            return None
+        try:
+            entry = json.loads(self._entry_path(digest).read_text())
+            if entry.get("digest") != digest:
+                return None
+            return CompiledTemplate(template_text, pattern=entry["pattern"], groups=entry["groups"])
+        except (OSError, ValueError, KeyError, re.error):
+            return None  # missing or corrupt entry -> recompile
+
+    def _save(self, compiled):
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            final = self._entry_path(compiled.digest)
+            tmp = final.with_name(f"{final.name}.tmp-{os.getpid()}")
+            tmp.write_text(json.dumps(compiled.to_dict()))
+            os.replace(tmp, final)  # atomic
+        except OSError:
+            pass  # the disk cache is an optimization only
+
+
+# shared by parse_with_template and the CLI; METASCRIBE_CACHE_DIR enables the on-disk layer
+default_cache = TemplateCache(cache_dir=os.environ.get("METASCRIBE_CACHE_DIR"))
+
+
+def parse_with_template(template_path, result_path, cache=None, engine="regex"):
     """Extract variables from a rendered SLURM script."""
-    template_text = Path(template_path).read_text()
+    if cache is None:
+        cache = default_cache
+    compiled = cache.load(template_path)
     result_text = Path(result_path).read_text()
     # result_text = "\n".join(line for line in Path(result_path).read_text().splitlines() if not line.startswith("WARNING:"))
     # print(result_text)
 
-    regex = jinja_to_regex(template_text)
-    # print(f"Using regex pattern:\n{regex.pattern}\n{'-'*40}")
-    match = regex.search(result_text)
-    if not match:
-        raise ValueError("Could not match template with rendered file.")
-
-    # strip whitespace and handle repeated vars consistently
-    data_ =  {k.strip(): v.strip() for k, v in match.groupdict().items()}
-    data = {}
-    for k, v in data_.items():
-        key = k.split("__")[0]  # remove occurrence suffix
-        data[key] = v 
-    return data
+    return compiled.match(result_text, engine=engine)
 
 
 if __name__ == "__main__":
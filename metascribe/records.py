@@ -0,0 +1,127 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import re
+import mmap
+from itertools import islice
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+from metascribe.parser import template_segments, literal_to_regex
+from metascribe.stream import page_releaser
+
+
+def record_to_regex(template_text):
+    """
+    Like jinja_to_regex, but for a template describing one record that
+    repeats through a file (e.g. one line per iteration). Values never span
+    lines; a variable that starts the template starts at a line start and
+    one that ends it runs to the end of the line.
+    """
+    literals, groups = template_segments(template_text)
+    parts = ["^" if literals[0] == "" else ""]
+    for literal, group in zip(literals, groups):
+        parts.append(literal_to_regex(literal))
+        parts.append(f"(?P<{group}>.+?)")
+    parts.append(literal_to_regex(literals[-1]) if literals[-1] else "$")
+    return "".join(parts), groups
+
+
+class RecordTemplate:
+    """
+    A record template compiled for repeated extraction. Matches are written
+    straight into per-variable column buffers and returned as Arrow record
+    batches; when a variable repeats inside the record the last occurrence
+    wins, as in parse_with_template.
+    """
+    def __init__(self, template_text):
+        self.text = template_text
+        self.pattern, groups = record_to_regex(template_text)
+        self.regex = re.compile(self.pattern, re.MULTILINE)
+        self.bytes_regex = re.compile(self.pattern.encode("utf-8"), re.MULTILINE)
+
+        # variable -> index of its last occurrence in match.groups()
+        last = {}
+        for i, group in enumerate(groups):
+            last[group.split("__")[0]] = i
+        self.columns = list(last)
+        self._indices = list(last.values())
+
+    @classmethod
+    def from_file(cls, template_path):
+        return cls(Path(template_path).read_text())
+
+    def iter_batches(self, data, types=None, batch_size=65536, on_advance=None):
+        """
+        Yield pyarrow.RecordBatch objects of up to `batch_size` records found
+        in `data` (str, bytes or an mmap). `types` maps variables to Arrow
+        types (or type names such as "int64") to cast their columns to.
+        """
+        is_text = isinstance(data, str)
+        regex = self.regex if is_text else self.bytes_regex
+        raw_type = pa.string() if is_text else pa.binary()
+        matches = regex.finditer(data)
+        while True:
+            batch = list(islice(matches, batch_size))
+            if not batch:
+                return
+            columns = list(zip(*(m.groups() for m in batch)))
+            arrays = []
+            for name, i in zip(self.columns, self._indices):
+                arr = pa.array(columns[i], type=raw_type)
+                if not is_text:
+                    arr = arr.cast(pa.string())
+                arr = pc.utf8_trim_whitespace(arr)
+                if types and name in types:
+                    arr = arr.cast(types[name])
+                arrays.append(arr)
+            yield pa.RecordBatch.from_arrays(arrays, names=self.columns)
+            if on_advance is not None:
+                on_advance(batch[-1].end())
+
+    def schema(self, types=None):
+        types = types or {}
+        return pa.schema([(name, pa.type_for_alias(types[name]) if isinstance(types.get(name), str)
+                           else types.get(name, pa.string())) for name in self.columns])
+
+    def extract(self, data, types=None, batch_size=65536) -> pa.Table:
+        """All records of `data` as one pyarrow.Table."""
+        batches = list(self.iter_batches(data, types=types, batch_size=batch_size))
+        return pa.Table.from_batches(batches, schema=self.schema(types))
+
+
+def _record_template(template):
+    if isinstance(template, RecordTemplate):
+        return template
+    return RecordTemplate.from_file(template)
+
+
+def iter_record_batches(template, result_path, types=None, batch_size=65536):
+    """
+    Stream the records of a file as pyarrow.RecordBatch objects. The file is
+    memory-mapped and pages behind the last emitted batch are released, so
+    neither the file nor the full result is ever held in memory.
+    `template` is a record template path or a RecordTemplate.
+    """
+    rtemplate = _record_template(template)
+    with open(result_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from rtemplate.iter_batches(mm, types=types, batch_size=batch_size,
+                                              on_advance=page_releaser(mm))
+
+
+def extract_records(template, result_path, types=None, batch_size=65536) -> pa.Table:
+    """
+    Extract every record of a file into a pyarrow.Table with one column per
+    template variable (strings unless cast via `types`). Hand it to
+    ``ParquetStoreWriter.add_table``/``RocksStore.put_df`` with ``.to_pandas()``.
+    """
+    rtemplate = _record_template(template)
+    batches = list(iter_record_batches(rtemplate, result_path, types=types, batch_size=batch_size))
+    return pa.Table.from_batches(batches, schema=rtemplate.schema(types))
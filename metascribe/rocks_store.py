@@ -1,18 +1,127 @@
 import os
-import time
 import json
-import io
+import heapq
+from collections import defaultdict
+from operator import itemgetter
 import pandas as pd
-from rocksdict import Rdict, Options, AccessType
+from rocksdict import (Rdict, Options, AccessType, ReadOptions,
+                       BlockBasedOptions, SliceTransform, WriteBatch,
+                       WriteOptions, Cache, DBCompressionType)
+from .file_lock import FileLock
+from .df_codec import encode_df, decode_df
 import logging
 logger = logging.getLogger(__name__)
 
+# rocksdict prefixes every encoded (non-raw) key with a one byte type tag, so
+# the prefix extractor sees one byte more than the python string.
+_KEY_TAG_LEN = 1
+
+
+def _encode_json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+# kind -> (encode, decode) for put_many / get_many
+_CODECS = {
+    "df": (encode_df, decode_df),
+    "json": (_encode_json, json.loads),
+    "string": (lambda value: value, str),
+}
+
+
+def _codec(kind):
+    try:
+        return _CODECS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown kind {kind!r}, expected one of {sorted(_CODECS)}")
+
+
+# Ready-made settings for RocksStore(column_families={namespace: profile}).
+NAMESPACE_PROFILES = {
+    # many tiny JSON / string values: small blocks, cheap compression and a
+    # cache of their own so point reads stay hot
+    "small": dict(compression="lz4", block_size=4 << 10, cache_size=64 << 20),
+    # MB-sized DataFrame blobs: values live in blob files, so compaction only
+    # rewrites the keys; big blocks and strong compression
+    "large": dict(compression="zstd", block_size=64 << 10, cache_size=16 << 20,
+                  min_blob_size=64 << 10),
+}
+
+
+def _compression(name):
+    if name not in ("none", "snappy", "zlib", "bz2", "lz4", "lz4hc", "zstd"):
+        raise ValueError(f"Unknown compression {name!r}")
+    return getattr(DBCompressionType, name)()
+
+
+def _make_options(prefix_len=8, bloom_bits=10, compression=None, block_size=None,
+                  cache_size=None, min_blob_size=None):
+    opts = Options()
+    opts.create_if_missing(True)
+    table = BlockBasedOptions()
+    if bloom_bits:
+        # Full (not block based) filters; also used for prefix seeks.
+        table.set_bloom_filter(bloom_bits, False)
+    if block_size:
+        table.set_block_size(block_size)
+    if cache_size:
+        table.set_block_cache(Cache(cache_size))
+    opts.set_block_based_table_factory(table)
+    if prefix_len:
+        # Max-len rather than fixed so keys shorter than prefix_len stay
+        # in the extractor's domain.
+        opts.set_prefix_extractor(SliceTransform.create_max_len_prefix(prefix_len))
+    if compression:
+        opts.set_compression_type(_compression(compression))
+    if min_blob_size is not None:
+        # Key/value separation: values >= min_blob_size go to blob files.
+        opts.set_enable_blob_files(True)
+        opts.set_min_blob_size(min_blob_size)
+        opts.set_enable_blob_gc(True)
+        if compression:
+            opts.set_blob_compression_type(_compression(compression))
+    return opts
+
+
+def namespace(key: str) -> str:
+    """First path segment of a key: "/configs/run1" -> "configs"."""
+    if key.startswith("/"):
+        key = key[1:]
+    return key.split("/", 1)[0]
+
+
 class RocksStore:
-    def __init__(self, db_path, lock=False, lock_timeout=300, force_open=False):
+    """
+    Key/value store over RocksDB.
+
+    Writers pass lock=True to serialize on `<db_path>.lock` (fcntl.flock, so
+    the lock is released immediately on close or process death). Readers
+    that must not queue behind the writer open with read_only=True (a
+    point-in-time view) or secondary_path=<dir> (a secondary instance that
+    follows the primary via catch_up()). Neither takes the lock.
+
+    column_families maps key namespaces (see namespace()) to their own column
+    family, e.g. {"configs": "small", "activity_log": {"compression": "zstd",
+    "min_blob_size": 1 << 20}}; values are NAMESPACE_PROFILES names or
+    _make_options keyword dicts. Families and their options persist in the
+    DB and keys are routed by namespace on every open, so later opens may
+    omit the mapping; new namespaces can be added by passing them. Keys a
+    namespace already has in the default family are moved into its family
+    by the next read-write open.
+    """
+    def __init__(self, db_path, lock=False, lock_timeout=300, force_open=False,
+                 prefix_len=8, bloom_bits=10, read_only=False, secondary_path=None,
+                 df_codec="parquet", column_families=None):
         self.db_path = db_path
+        self.df_codec = df_codec
+        self.prefix_len = prefix_len
         self.lock_path = f"{db_path}.lock"
         self._store = None
-        self.lock = lock
+        self._families = {}
+        self._handles = {}
+        self.read_only = read_only or secondary_path is not None
+        self.lock = lock and not self.read_only
+        self._lock = None
         
         parent_dir = os.path.dirname(os.path.abspath(db_path))
         if parent_dir and not os.path.exists(parent_dir):
@@ -22,70 +131,267 @@ class RocksStore:
             except Exception as e:
                 raise IOError(f"Could not create parent directory {parent_dir}: {e}")
         
-        # 1. Force open logic
-        if force_open and os.path.exists(self.lock_path):
-            os.remove(self.lock_path)
-        
-        # 2. Manual Locking Logic 
+        # force_open used to clear stale lock files; flock locks cannot go
+        # stale, so it is accepted for compatibility and otherwise ignored.
         if self.lock:
-            t0 = time.time()
-            while True:
-                try:
-                    # Atomic file creation for locking
-                    os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
-                    break
-                except FileExistsError:
-                    if time.time() - t0 > lock_timeout:
-                        raise TimeoutError(f"Lock timeout: {self.lock_path}")
-                    time.sleep(1)  
-        
-        # 3. Open the DB
+            self._lock = FileLock(self.lock_path, timeout=lock_timeout).acquire()
+
+        if secondary_path is not None:
+            access = AccessType.secondary(secondary_path)
+        elif read_only:
+            access = AccessType.read_only()
+        else:
+            access = AccessType.read_write()
+
+        family_opts = {}
+        for ns, spec in (column_families or {}).items():
+            if isinstance(spec, str):
+                spec = NAMESPACE_PROFILES[spec]
+            family_opts[namespace(ns)] = _make_options(prefix_len, bloom_bits, **spec)
+
         try:
-            self._store = Rdict(db_path)
+            open_opts = {}
+            if os.path.exists(os.path.join(db_path, "CURRENT")):
+                # Families not configured this time open with their persisted options.
+                _, open_opts = Options.load_latest(db_path)
+                open_opts.pop("default", None)
+            existing = set(open_opts)
+            open_opts.update((ns, o) for ns, o in family_opts.items() if ns in existing)
+            self._store = Rdict(db_path, _make_options(prefix_len, bloom_bits),
+                                column_families=open_opts, access_type=access)
+            for ns in existing:
+                self._families[ns] = self._store.get_column_family(ns)
+            if not self.read_only:
+                for ns, opts in family_opts.items():
+                    if ns not in existing:
+                        self._families[ns] = self._store.create_column_family(ns, opts)
+            for ns in self._families:
+                self._handles[ns] = self._store.get_column_family_handle(ns)
+            if not self.read_only:
+                for ns in self._families:
+                    self._adopt_namespace(ns)
         except Exception as e:
-            if self.lock and os.path.exists(self.lock_path):
-                os.remove(self.lock_path)
+            self._close_store()
+            self._release_lock()
             raise IOError(f"Could not open RocksDB at {db_path}: {e}")
 
-    def put_df(self, key: str, df: pd.DataFrame):
-        # We use parquet for storage to keep it "object-like" and efficient
-        self._store[key] = df.to_parquet()
+    def _cf(self, key: str):
+        # Column family (an Rdict view) holding `key`.
+        if not self._families:
+            return self._store
+        return self._families.get(namespace(key), self._store)
+
+    def _adopt_namespace(self, ns: str, batch_size: int = 10_000) -> int:
+        """
+        Move keys of namespace `ns` written to the default family (before
+        the namespace got a family of its own) into its family. Each key's
+        put and delete share a WriteBatch, so an interrupted move loses
+        nothing and finishes on the next open. Returns the number moved.
+        """
+        handle = self._handles[ns]
+        ro = self._read_options()
+        n = 0
+        for prefix in (f"/{ns}", ns):
+            while True:
+                wb = WriteBatch()
+                items = self._bounded(self._store.items(from_key=prefix, read_opt=ro),
+                                      lambda key: not key.startswith(prefix))
+                for key, value in items:
+                    if namespace(key) != ns:
+                        continue
+                    wb.put(key, value, handle)
+                    wb.delete(key)
+                    if len(wb) >= 2 * batch_size:
+                        break
+                moved = len(wb) // 2
+                if not moved:
+                    break
+                self._store.write(wb)
+                n += moved
+        if n:
+            logger.info(f"Moved {n} keys of namespace '{ns}' into its column family")
+        return n
+
+    def _release_lock(self):
+        if self._lock is not None:
+            self._lock.release()
+            self._lock = None
+
+    def catch_up(self):
+        """Replay the primary's new writes into a secondary instance."""
+        self._store.try_catch_up_with_primary()
+
+    def _get(self, key: str, message: str):
+        # Single lookup; stored values are never None.
+        raw = self._cf(key).get(key)
+        if raw is None:
+            raise KeyError(message)
+        return raw
+
+    def put_df(self, key: str, df: pd.DataFrame, codec: str = None):
+        # codec: "parquet" (default, readable by older versions), "ipc",
+        # "ipc-zstd" or "ipc-lz4"; see df_codec.
+        self._cf(key)[key] = encode_df(df, codec or self.df_codec)
         
-    def get_df(self, key: str) -> pd.DataFrame:
-        if key not in self._store:
-            raise KeyError(f"Key {key} not found in RocksStore at {self.db_path}")
-            
-        raw_data = self._store[key]
-        return pd.read_parquet(io.BytesIO(raw_data))
+    def get_df(self, key: str, columns=None) -> pd.DataFrame:
+        raw_data = self._get(key, f"Key {key} not found in RocksStore at {self.db_path}")
+        return decode_df(raw_data, columns=columns)
 
     def put_json(self, key: str, obj: dict):
-        json_str = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
-        self._store[key] = json_str
+        self._cf(key)[key] = _encode_json(obj)
         
     def get_json(self, key: str) -> dict:
-        if key not in self._store:
-            raise KeyError(f"Key {key} not found")
-            
-        return json.loads(self._store[key])
+        return json.loads(self._get(key, f"Key {key} not found"))
     
     def put_string(self, key: str, value: str):
-        self._store[key] = value
+        self._cf(key)[key] = value
         
     def get_string(self, key: str) -> str:
-        if key not in self._store:
-            raise KeyError(f"Key {key} not found")
-            
-        return str(self._store[key])
-    
-    # def keys_with_prefix(self, prefix: str):
-        
+        return str(self._get(key, f"Key {key} not found"))
+
+    def put_many(self, items, kind: str = "json", disable_wal: bool = False,
+                 batch_size: int = 10_000) -> int:
+        """
+        Write many values of one kind ("df", "json" or "string") through
+        WriteBatch, committing every `batch_size` entries.
+        `items` is a dict or an iterable of (key, value) pairs.
+
+        disable_wal skips the write-ahead log for bulk loads; the memtable is
+        flushed at the end instead, so a crash mid-load loses the unflushed
+        part of that load. Returns the number of entries written.
+        """
+        encode, _ = _codec(kind)
+        if kind == "df":
+            encode = lambda df: encode_df(df, self.df_codec)
+        if isinstance(items, dict):
+            items = items.items()
+        write_opt = WriteOptions()
+        write_opt.disable_wal = disable_wal
+
+        n = 0
+        wb = WriteBatch()
+        for key, value in items:
+            if self._handles:
+                wb.put(key, encode(value), self._handles.get(namespace(key)))
+            else:
+                wb.put(key, encode(value))
+            n += 1
+            if n % batch_size == 0:
+                self._store.write(wb, write_opt)
+                wb = WriteBatch()
+        if len(wb):
+            self._store.write(wb, write_opt)
+        if disable_wal and n:
+            self._store.flush()
+            for cf in self._families.values():
+                cf.flush()
+        return n
+
+    def _multi_get(self, keys, kind):
+        _, decode = _codec(kind)
+        keys = list(keys)
+        if not self._families:
+            raws = self._store.get(keys)
+        else:
+            # one multi_get per column family, results back in key order
+            groups = defaultdict(list)
+            for i, key in enumerate(keys):
+                groups[namespace(key) if namespace(key) in self._families else None].append(i)
+            raws = [None] * len(keys)
+            for ns, idx in groups.items():
+                cf = self._families[ns] if ns is not None else self._store
+                for i, raw in zip(idx, cf.get([keys[i] for i in idx])):
+                    raws[i] = raw
+        for key, raw in zip(keys, raws):
+            if raw is not None:
+                yield key, decode(raw)
+
+    def get_many(self, keys, kind: str = "json") -> dict:
+        """
+        Fetch many keys with one multi_get and decode them as `kind`.
+        Missing keys are left out of the returned dict.
+        """
+        return dict(self._multi_get(keys, kind))
+
+    def iter_many(self, keys, kind: str = "json"):
+        """Like get_many, but lazily yields (key, decoded value) pairs."""
+        yield from self._multi_get(keys, kind)
+
+    def _read_options(self, prefix=None):
+        ro = ReadOptions()
+        if (prefix is not None and self.prefix_len
+                and len(prefix.encode()) + _KEY_TAG_LEN >= self.prefix_len):
+            # The whole scan shares one extractor prefix -> bloom filters
+            # can skip SST files that hold nothing under it.
+            ro.set_prefix_same_as_start(True)
+        else:
+            ro.set_total_order_seek(True)
+        return ro
+
+    def _scan_prefix(self, prefix: str):
+        # One seek, then a sequential walk. Bounds are checked here rather
+        # than with iterate_upper_bound, which rocksdict does not keep alive
+        # reliably across the iterator's lifetime.
+        ro = self._read_options(prefix)
+        rest = prefix[1:] if prefix.startswith("/") else prefix
+        if "/" in rest:
+            families = [self._cf(prefix)]
+        else:
+            # prefix may span namespaces
+            families = [self._store] + [cf for ns, cf in self._families.items()
+                                        if ns.startswith(rest)]
+        iters = [self._bounded(cf.items(from_key=prefix, read_opt=ro),
+                               lambda key: not key.startswith(prefix))
+                 for cf in families]
+        yield from self._merge(iters)
+
+    @staticmethod
+    def _bounded(items, past_end):
+        for key, value in items:
+            if past_end(key):
+                break
+            yield key, value
+
+    @staticmethod
+    def _merge(iters):
+        # Each column family iterates in key order; merge them lazily.
+        if len(iters) == 1:
+            return iters[0]
+        return heapq.merge(*iters, key=itemgetter(0))
+
+    def keys_with_prefix(self, prefix: str):
+        """Lazily yield keys starting with `prefix`, in sorted order."""
+        for key, _ in self._scan_prefix(prefix):
+            yield key
+
+    def items_with_prefix(self, prefix: str):
+        """Lazily yield (key, raw value) pairs for keys starting with `prefix`."""
+        yield from self._scan_prefix(prefix)
+
+    def range(self, start: str = None, end: str = None):
+        """Lazily yield (key, raw value) pairs with start <= key < end.
+
+        Either bound may be None for an open-ended scan.
+        """
+        ro = self._read_options()
+        # str ordering matches RocksDB's bytewise ordering of utf-8 keys
+        past_end = (lambda key: False) if end is None else (lambda key: key >= end)
+        yield from self._merge([self._bounded(cf.items(from_key=start, read_opt=ro), past_end)
+                                for cf in [self._store, *self._families.values()]])
     
     def close(self):
+        self._close_store()
+        self._release_lock()
+
+    def _close_store(self):
+        # Family views keep the DB open; close them first.
+        for cf in self._families.values():
+            cf.close()
+        self._families.clear()
+        self._handles.clear()
         if self._store is not None:
             self._store.close()
-            if self.lock:
-                if os.path.exists(self.lock_path):
-                    os.remove(self.lock_path)    
+            self._store = None
             
     def __enter__(self):
         return self
@@ -0,0 +1,133 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import time
+import uuid
+import json
+import socket
+from pathlib import Path
+
+
+def _record_name():
+    # time-ordered and unique across hosts/processes
+    return f"{time.time_ns():020d}-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+
+
+def spool_record(spool_dir, table_name, row, pk=None):
+    """
+    Write one record destined for `table_name` as a small file in
+    `spool_dir`. The file is written under a temporary name and renamed into
+    place, so an ingester never sees a partial record. Returns its path.
+    """
+    spool_dir = Path(spool_dir)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    final = spool_dir / _record_name()
+    tmp = spool_dir / f".{final.name}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump({"table": table_name, "pk": pk, "row": row}, f, ensure_ascii=False, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, final)  # atomic
+    return final
+
+
+def _claim_dir(spool_dir):
+    return Path(spool_dir) / f".ingest-{socket.gethostname()}-{os.getpid()}"
+
+
+def _recover_stale_claims(spool_dir):
+    """Return records claimed by ingesters on this host that died mid-run."""
+    host = socket.gethostname()
+    for claim in Path(spool_dir).glob(f".ingest-{host}-*"):
+        try:
+            pid = int(claim.name.rsplit("-", 1)[1])
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, 0)
+            continue  # still running
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            continue
+        for f in claim.glob("*.json"):
+            os.replace(f, Path(spool_dir) / f.name)
+        try:
+            claim.rmdir()
+        except OSError:
+            pass
+
+
+def ingest_spool(spool_dir, store, batch_size=10_000, max_files=100_000):
+    """
+    Bulk-load spooled records into `store` (an SQLStore) and delete them.
+    Files are first claimed by renaming them into a per-process directory,
+    so concurrent ingesters never load a record twice; records are grouped
+    by (table, pk) and written with store_many in large transactions. On a
+    database error the claimed files whose records were not committed are
+    put back for the next run.
+    Returns the number of records ingested.
+    """
+    spool_dir = Path(spool_dir)
+    if not spool_dir.is_dir():
+        return 0
+    _recover_stale_claims(spool_dir)
+    claim_dir = _claim_dir(spool_dir)
+    claim_dir.mkdir(exist_ok=True)
+
+    n_ingested = 0
+    try:
+        while True:
+            names = sorted(e.name for e in os.scandir(spool_dir)
+                           if e.name.endswith(".json") and not e.name.startswith("."))[:max_files]
+            if not names:
+                break
+
+            groups = {}  # (table, pk) -> (rows, files)
+            for name in names:
+                claimed = claim_dir / name
+                try:
+                    os.rename(spool_dir / name, claimed)
+                except FileNotFoundError:
+                    continue  # taken by another ingester
+                try:
+                    rec = json.loads(claimed.read_text())
+                    key = (rec["table"], rec.get("pk"))
+                    row = rec["row"]
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Skipping malformed spool record {name}: {e}")
+                    os.replace(claimed, spool_dir / f".{name}.bad")
+                    continue
+                rows, files = groups.setdefault(key, ([], []))
+                rows.append(row)
+                files.append(claimed)
+
+            for (table_name, pk), (rows, files) in groups.items():
+                stored = store.store_many(table_name, rows, pk=pk, batch_size=batch_size)
+                if stored != len(rows):
+                    # store_many commits every batch_size rows, in order: the
+                    # first `stored` records are in the database, so only the
+                    # rest go back (re-inserting rows without a pk duplicates them)
+                    for f in files[:stored]:
+                        f.unlink()
+                    for f in files[stored:]:
+                        os.replace(f, spool_dir / f.name)
+                    raise IOError(f"Could not ingest {len(rows) - stored} of {len(rows)} spooled "
+                                  f"records into '{table_name}'")
+                for f in files:
+                    f.unlink()
+                n_ingested += len(rows)
+    finally:
+        for f in claim_dir.glob("*.json"):
+            os.replace(f, spool_dir / f.name)
+        try:
+            claim_dir.rmdir()
+        except OSError:
+            pass
+    return n_ingested
@@ -5,13 +5,29 @@
 # the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
 
 import sqlite3
+from itertools import islice
+from operator import itemgetter
 
 class SQLStore:
-    def __init__(self, sql_path):
+    def __init__(self, sql_path, journal_mode=None, synchronous=None, cache_size=None, mmap_size=None,
+                 timeout=30.0):
+        """
+        Optional pragmas for bulk ingestion, e.g. journal_mode="WAL",
+        synchronous="NORMAL", cache_size=-65536 (KiB when negative),
+        mmap_size=268435456. Nothing is changed unless requested.
+        `timeout` is how long to wait for a lock held by another connection.
+        """
         self.sql_path = sql_path
+        self._schemas = {}  # table -> {"columns": {name: type}, "pk": [names]}
+        self._indexes = {}  # table -> {index name: (columns, unique, created)}
         try:
-            self.conn = sqlite3.connect(self.sql_path)
+            self.conn = sqlite3.connect(self.sql_path, timeout=timeout)
             self.cursor = self.conn.cursor()
+            pragmas = {"journal_mode": journal_mode, "synchronous": synchronous,
+                       "cache_size": cache_size, "mmap_size": mmap_size}
+            for name, value in pragmas.items():
+                if value is not None:
+                    self.cursor.execute(f"PRAGMA {name}={value}")
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
             self.conn = None
@@ -26,34 +42,318 @@ class SQLStore:
             print("No data provided to store.")
             return
 
-        # 1. Dynamically create the table with an optional Primary Key
-        col_list = []
-        for k, v in kwargs.items():
-            col_type = self._get_sqlite_type(v)
-            # Append 'PRIMARY KEY' string if this key matches the pk argument
-            if k == pk:
-                col_list.append(f"{k} {col_type} PRIMARY KEY")
-            else:
-                col_list.append(f"{k} {col_type}")
-
-        cols_definition = ', '.join(col_list)
-        create_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ({cols_definition})"
+        # 1. Create the table, or add/widen columns, only when needed
+        col_types = {k: self._get_sqlite_type(v) if v is not None else None for k, v in kwargs.items()}
         
         # 2. Prepare the INSERT OR REPLACE statement
-        columns = ', '.join(kwargs.keys())
-        placeholders = ', '.join('?' * len(kwargs))
+        columns = tuple(kwargs.keys())
         values = tuple(kwargs.values())
-        insert_sql = f"INSERT OR REPLACE INTO {table_name} ({columns}) VALUES ({placeholders})"
+        insert_sql = self._insert_sql(table_name, columns)
         
         try:
-            self.cursor.execute(create_sql)
-            self.cursor.execute(insert_sql, values)
+            self._run_with_schema(table_name, col_types, pk,
+                                  lambda: self.cursor.execute(insert_sql, values))
             self.conn.commit()
             print(f"Successfully stored data in '{table_name}'")
         except sqlite3.Error as e:
             print(f"Error processing database: {e}")
             
     
+    def store_many(self, table_name, rows, pk=None, batch_size=10_000):
+        """
+        Bulk version of store(). `rows` is an iterable of dicts, a pandas
+        DataFrame or a pyarrow Table/RecordBatch. The table is created once
+        and rows are inserted with executemany in transactions of
+        `batch_size` rows, reusing the same INSERT text so that sqlite's
+        statement cache is hit. Returns the number of rows stored.
+        """
+        if not self.cursor:
+            print("No database connection.")
+            return 0
+
+        n_stored = 0
+        insert_sqls = {}
+        try:
+            for columns, batch in self._iter_row_batches(rows, batch_size):
+                if not batch:
+                    continue
+                insert_sql = insert_sqls.get(columns)
+                if insert_sql is None:
+                    insert_sql = insert_sqls[columns] = self._insert_sql(table_name, columns)
+                col_types = self._batch_types(columns, batch)
+                with self.conn:  # one transaction per batch
+                    self._run_with_schema(table_name, col_types, pk,
+                                          lambda: self.cursor.executemany(insert_sql, batch))
+                n_stored += len(batch)
+        except sqlite3.Error as e:
+            print(f"Error processing database: {e}")
+            return n_stored
+
+        print(f"Successfully stored {n_stored} rows in '{table_name}'")
+        return n_stored
+
+    # ---------- schema registry ----------
+    _TYPE_RANK = {"INTEGER": 0, "REAL": 1, "TEXT": 2}
+
+    def _table_schema(self, table_name):
+        """Cached {column: type} of a table, None if it does not exist."""
+        schema = self._schemas.get(table_name)
+        if schema is None:
+            info = self.cursor.execute(f"PRAGMA table_info({table_name})").fetchall()
+            if not info:
+                return None
+            # (cid, name, type, notnull, default, pk)
+            schema = {"columns": {row[1]: row[2].upper() for row in info},
+                      "pk": [row[1] for row in sorted(info, key=lambda r: r[5]) if row[5]]}
+            self._schemas[table_name] = schema
+        return schema["columns"]
+
+    def _run_with_schema(self, table_name, col_types, pk, insert):
+        """Run `insert` after reconciling the table schema with `col_types`."""
+        self._ensure_table(table_name, col_types, pk)
+        try:
+            insert()
+        except sqlite3.OperationalError as e:
+            if "column" not in str(e):
+                raise
+            # another process may have changed the table: reload and retry once
+            self._schemas.pop(table_name, None)
+            self._ensure_table(table_name, col_types, pk)
+            insert()
+
+    def _ensure_table(self, table_name, col_types, pk):
+        """
+        Create the table, add unseen columns and widen column types
+        (INTEGER -> REAL -> TEXT). A no-op, without any query, once the
+        cached schema already covers `col_types`. A type of None (only
+        NULLs seen) never widens a column and creates it as TEXT.
+        """
+        existing = self._table_schema(table_name)
+        if existing is None:
+            col_list = []
+            for k, col_type in col_types.items():
+                col_type = col_type or "TEXT"
+                # Append 'PRIMARY KEY' string if this key matches the pk argument
+                if k == pk:
+                    col_list.append(f"{k} {col_type} PRIMARY KEY")
+                else:
+                    col_list.append(f"{k} {col_type}")
+            self.cursor.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(col_list)})")
+            self._schemas.pop(table_name, None)
+            self._table_schema(table_name)
+            self._create_declared_indexes(table_name)
+            return
+
+        widened = {}
+        added = False
+        for k, col_type in col_types.items():
+            old_type = existing.get(k)
+            if old_type is None:
+                col_type = col_type or "TEXT"
+                self.cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {k} {col_type}")
+                existing[k] = col_type
+                added = True
+            elif col_type and self._TYPE_RANK.get(col_type, 2) > self._TYPE_RANK.get(old_type, 2):
+                widened[k] = col_type
+        if widened:
+            self._widen_columns(table_name, widened)
+        if added:
+            self._create_declared_indexes(table_name)
+
+    def _widen_columns(self, table_name, widened):
+        """Rebuild a table with wider column types, keeping its rows and indexes."""
+        schema = self._schemas[table_name]
+        columns = dict(schema["columns"], **widened)
+        pk = schema["pk"]
+        col_list = [f"{k} {t}" for k, t in columns.items()]
+        if pk:
+            col_list.append(f"PRIMARY KEY ({', '.join(pk)})")
+        index_sqls = [row[0] for row in self.cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+            (table_name,))]
+        tmp_name = f"{table_name}__widen"
+        names = ', '.join(columns)
+        self.cursor.execute("SAVEPOINT widen_columns")
+        try:
+            self.cursor.execute(f"DROP TABLE IF EXISTS {tmp_name}")
+            self.cursor.execute(f"CREATE TABLE {tmp_name} ({', '.join(col_list)})")
+            self.cursor.execute(f"INSERT INTO {tmp_name} ({names}) SELECT {names} FROM {table_name}")
+            self.cursor.execute(f"DROP TABLE {table_name}")
+            self.cursor.execute(f"ALTER TABLE {tmp_name} RENAME TO {table_name}")
+            for sql in index_sqls:
+                self.cursor.execute(sql)
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK TO widen_columns")
+            self.cursor.execute("RELEASE widen_columns")
+            self._schemas.pop(table_name, None)
+            raise
+        self.cursor.execute("RELEASE widen_columns")
+        schema["columns"] = columns
+
+    def _batch_types(self, columns, batch):
+        """Widest SQLite type of every column over a batch of row tuples."""
+        col_types = {}
+        for k, values in zip(columns, zip(*batch)):
+            kinds = set(map(type, values))
+            kinds.discard(type(None))
+            if not kinds:
+                col_types[k] = None
+            elif kinds <= {int, bool}:
+                col_types[k] = "INTEGER"
+            elif kinds <= {int, bool, float}:
+                col_types[k] = "REAL"
+            else:
+                col_types[k] = "TEXT"
+        return col_types
+
+    def _insert_sql(self, table_name, columns):
+        placeholders = ', '.join('?' * len(columns))
+        return f"INSERT OR REPLACE INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def _iter_row_batches(self, rows, batch_size):
+        """Yield (columns, [tuple, ...]) batches of at most batch_size rows."""
+        # pandas / pyarrow input is converted column-wise, not row by row
+        if hasattr(rows, "to_batches") or hasattr(rows, "num_columns") or hasattr(rows, "iloc"):
+            import pyarrow as pa
+            if hasattr(rows, "iloc"):
+                rows = pa.Table.from_pandas(rows, preserve_index=False)
+            batches = rows.to_batches(max_chunksize=batch_size) if hasattr(rows, "to_batches") else [rows]
+            for rb in batches:
+                columns = tuple(rb.schema.names)
+                yield columns, list(zip(*(col.to_pylist() for col in rb.columns)))
+            return
+
+        it = iter(rows)
+        while True:
+            chunk = list(islice(it, batch_size))
+            if not chunk:
+                return
+            keys = dict.fromkeys(chunk[0])
+            for row in chunk:
+                if row.keys() != keys.keys():
+                    keys.update(dict.fromkeys(row))
+            columns = tuple(keys)
+            getter = itemgetter(*columns)
+            try:
+                values = list(map(getter, chunk))
+            except KeyError:  # some rows lack some columns
+                values = [tuple(row.get(k) for k in columns) for row in chunk]
+            if len(columns) == 1:
+                values = [(v,) for v in values]
+            yield columns, values
+
+    # ---------- indexes ----------
+    def declare_index(self, table_name, columns, unique=False, name=None):
+        """
+        Declare a secondary index, e.g. declare_index("jobs", ["partition", "nnodes"]).
+        It is created (IF NOT EXISTS) as soon as the table has all of its
+        columns, at most once per connection, and kept across schema changes.
+        Returns the index name.
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        name = name or f"idx_{table_name}_{'_'.join(columns)}"
+        declared = self._indexes.setdefault(table_name, {})
+        if name not in declared:
+            declared[name] = (tuple(columns), unique, False)
+        if self.cursor:
+            try:
+                self._create_declared_indexes(table_name)
+            except sqlite3.Error as e:
+                print(f"Error processing database: {e}")
+        return name
+
+    def _create_declared_indexes(self, table_name):
+        declared = self._indexes.get(table_name)
+        if not declared:
+            return
+        existing = self._table_schema(table_name)
+        if existing is None:
+            return
+        for name, (columns, unique, created) in declared.items():
+            if created or not all(c in existing for c in columns):
+                continue
+            unique_sql = "UNIQUE " if unique else ""
+            self.cursor.execute(
+                f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table_name} ({', '.join(columns)})")
+            declared[name] = (columns, unique, True)
+
+    # ---------- queries ----------
+    _ARROW_TYPES = {"INTEGER": "int64", "REAL": "float64", "TEXT": "string"}
+
+    def iter_query(self, table_name, columns=None, where=None, params=(), order_by=None, limit=None,
+                   batch_size=10_000, output="arrow"):
+        """
+        Stream the rows of `table_name` in batches fetched with fetchmany,
+        as pyarrow.RecordBatch (output="arrow") or pandas.DataFrame
+        (output="pandas") objects. `where` is an SQL condition with ``?``
+        (or ``:name``) placeholders bound from `params`, e.g.
+        iter_query("jobs", ["jobid", "nnodes"], where="partition = ? AND nnodes >= ?",
+        params=("xxx", 4), order_by="nnodes DESC").
+        """
+        import pyarrow as pa
+
+        if not self.cursor:
+            print("No database connection.")
+            return
+        if isinstance(columns, str):
+            columns = [columns]
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        sql = f"SELECT {', '.join(columns) if columns else '*'} FROM {table_name}"
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {', '.join(order_by)}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        cursor = self.conn.cursor()  # independent of store()'s cursor
+        try:
+            cursor.execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            declared = self._table_schema(table_name) or {}
+            types = [self._ARROW_TYPES.get(declared.get(n)) for n in names]
+            first = True
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if rows:
+                    arrays = [self._to_arrow(values, t) for values, t in zip(zip(*rows), types)]
+                elif first:
+                    # an empty result still reports its columns
+                    arrays = [pa.array([], type=t) for t in types]
+                else:
+                    return
+                batch = pa.RecordBatch.from_arrays(arrays, names=names)
+                yield batch.to_pandas() if output == "pandas" else batch
+                if not rows:
+                    return
+                first = False
+        finally:
+            cursor.close()
+
+    def query(self, table_name, columns=None, where=None, params=(), order_by=None, limit=None,
+              batch_size=10_000, output="arrow"):
+        """Like iter_query(), but returns one pyarrow.Table or pandas.DataFrame."""
+        import pyarrow as pa
+
+        batches = list(self.iter_query(table_name, columns, where, params, order_by, limit,
+                                       batch_size=batch_size, output="arrow"))
+        if not batches:
+            return None
+        # batches of untyped (expression) columns may infer different types
+        table = pa.concat_tables([pa.Table.from_batches([b]) for b in batches], promote_options="permissive")
+        return table.to_pandas() if output == "pandas" else table
+
+    @staticmethod
+    def _to_arrow(values, arrow_type):
+        import pyarrow as pa
+        try:
+            return pa.array(values, type=arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # SQLite columns may hold mixed types: fall back to text
+            return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
     def _get_sqlite_type(self, value):
         """Helper to map Python types to SQLite types."""
         if isinstance(value, int): return "INTEGER"
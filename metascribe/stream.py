@@ -0,0 +1,89 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import mmap
+from metascribe.parser import CompiledTemplate, default_cache
+
+DEFAULT_WINDOW = 4 << 20  # 4 MiB
+SCAN_WINDOW = 64 << 20    # 64 MiB
+
+
+def _compiled(template, cache):
+    if isinstance(template, CompiledTemplate):
+        return template
+    return (cache if cache is not None else default_cache).load(template)
+
+
+def parse_mmap(template, result_path, engine="anchor", cache=None, window=SCAN_WINDOW):
+    """
+    Match a template against a memory-mapped file without reading or
+    decoding it into a Python str; only the captured values are decoded.
+
+    With the anchor engine (the default) the mapping is scanned `window`
+    bytes at a time and pages already scanned are dropped from the process,
+    so peak memory stays around `window` plus the size of the values
+    regardless of file size. The regex engine works on the mapping too but
+    keeps every page it touched resident.
+
+    `template` is a template path or a CompiledTemplate.
+    """
+    compiled = _compiled(template, cache)
+    with open(result_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return compiled.match(b"", engine=engine)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if engine != "anchor":
+                return compiled.match(mm, engine=engine)
+            return compiled.match(mm, engine=engine, window=window, on_advance=page_releaser(mm))
+
+
+def page_releaser(mm):
+    """on_advance callback dropping the scanned part of a mapping from RSS."""
+    if not hasattr(mm, "madvise") or not hasattr(mmap, "MADV_DONTNEED"):
+        return None
+    mm.madvise(mmap.MADV_SEQUENTIAL)
+    released = 0
+
+    def release(offset):
+        nonlocal released
+        upto = offset - offset % mmap.PAGESIZE
+        if upto > released:
+            # file-backed read-only pages: dropping them only costs a re-fault
+            mm.madvise(mmap.MADV_DONTNEED, released, upto - released)
+            released = upto
+    return release
+
+
+def read_head(result_path, window=DEFAULT_WINDOW):
+    with open(result_path, "rb") as f:
+        return f.read(window)
+
+
+def read_tail(result_path, window=DEFAULT_WINDOW):
+    with open(result_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - window))
+        return f.read(window)
+
+
+def parse_head_tail(result_path, head_template=None, tail_template=None,
+                    window=DEFAULT_WINDOW, engine="anchor", cache=None):
+    """
+    Extract values from the first and/or last `window` bytes of a file,
+    e.g. a header block written at job start and a summary block written at
+    the end. Peak memory is bounded by 2 * window regardless of file size.
+    Values from the tail template win over those from the head template.
+    """
+    if head_template is None and tail_template is None:
+        raise ValueError("At least one of head_template or tail_template is required.")
+
+    data = {}
+    if head_template is not None:
+        data.update(_compiled(head_template, cache).match(read_head(result_path, window), engine=engine))
+    if tail_template is not None:
+        data.update(_compiled(tail_template, cache).match(read_tail(result_path, window), engine=engine))
+    return data
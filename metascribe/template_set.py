@@ -0,0 +1,113 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+from pathlib import Path
+from metascribe.parser import default_cache, template_segments
+
+
+def required_fragments(template_text):
+    """
+    Whitespace-free pieces of a template's literal text. Spaces in a
+    template match any whitespace, but these pieces must appear verbatim
+    in every file rendered from it.
+    """
+    literals, _ = template_segments(template_text)
+    fragments = []
+    for literal in literals:
+        for piece in literal.split():
+            if "\\" not in piece and piece not in fragments:
+                fragments.append(piece)
+    return fragments
+
+
+class TemplateSet:
+    """
+    A collection of templates for classifying files whose producing
+    template is unknown. A file is first checked for each template's
+    literal fragments with plain substring searches, which run in C; only
+    templates whose fragments all occur are matched fully. Each template
+    stops at its first missing fragment, checking those it shares with the
+    fewest other templates first; a fragment is searched once per file.
+    """
+    def __init__(self, engine="regex", cache=None):
+        self.engine = engine
+        self.cache = cache if cache is not None else default_cache
+        self._templates = {}    # template id -> CompiledTemplate
+        self._fragments = {}    # template id -> list of required fragments
+        self._index = None
+        self._required = None   # template id -> frozenset of fragment ids
+
+    @classmethod
+    def from_paths(cls, paths, **kwargs):
+        """Build a set from template files, using each path as its template id."""
+        tset = cls(**kwargs)
+        for path in paths:
+            tset.add_file(path)
+        return tset
+
+    def add(self, template_id, template_text):
+        self._templates[template_id] = self.cache.get(template_text)
+        self._fragments[template_id] = required_fragments(template_text)
+        self._index = None
+
+    def add_file(self, template_path, template_id=None):
+        template_id = str(template_path) if template_id is None else template_id
+        self.add(template_id, Path(template_path).read_text())
+
+    def __len__(self):
+        return len(self._templates)
+
+    def __contains__(self, template_id):
+        return template_id in self._templates
+
+    def _build_index(self):
+        shared = {}  # fragment -> number of templates requiring it
+        for fragments in self._fragments.values():
+            for f in fragments:
+                shared[f] = shared.get(f, 0) + 1
+        fragment_ids = {}
+        required = {}
+        for tid, fragments in self._fragments.items():
+            # the fragments that tell templates apart first, so most
+            # templates are ruled out after a check or two
+            ordered = sorted(fragments, key=lambda f: (shared[f], -len(f)))
+            required[tid] = tuple(fragment_ids.setdefault(f, len(fragment_ids)) for f in ordered)
+        self._index = list(fragment_ids)
+        self._required = required
+
+    def candidates(self, text):
+        """
+        Template ids whose literal fragments all occur in `text`, most
+        specific (longest literal text) first.
+        """
+        if self._index is None:
+            self._build_index()
+        fragments = self._index
+        seen = {}  # fragment id -> occurs in text
+        survivors = []
+        for tid, required in self._required.items():
+            for fid in required:
+                found = seen.get(fid)
+                if found is None:
+                    found = seen[fid] = fragments[fid] in text
+                if not found:
+                    break
+            else:
+                survivors.append(tid)
+        survivors.sort(key=lambda tid: -sum(len(f) for f in self._fragments[tid]))
+        return survivors
+
+    def match(self, text):
+        """Return (template_id, data) for the first shortlisted template that matches."""
+        for tid in self.candidates(text):
+            try:
+                return tid, self._templates[tid].match(text, engine=self.engine)
+            except ValueError:
+                continue
+        raise ValueError("Could not match any template with rendered file.")
+
+    def match_file(self, result_path):
+        return self.match(Path(result_path).read_text())
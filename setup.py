@@ -22,6 +22,9 @@ setup(
         'console_scripts': [
             'md-parser=metascribe.cli:md_parser',
             'md-store=metascribe.cli:md_store',
+            'md-ingest=metascribe.cli:md_ingest',
+            'md-compact=metascribe.cli:md_compact',
+            'md-ingestd=metascribe.cli:md_ingestd',
         ],
     },
 )
@@ -0,0 +1,125 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+# Differential tests: the anchor engine must agree with the regex engine.
+# The anchor engine never backtracks, so on adversarial inputs it may report
+# a mismatch where the regex finds a match by backtracking, but it must never
+# return different values or match a file the regex rejects.
+
+import random
+import time
+from pathlib import Path
+from metascribe.parser import CompiledTemplate, parse_with_template
+
+template_file = "tests/files/template1.py"
+actual_file = "tests/files/actual1.py"
+
+def both(template_text, result_text):
+    compiled = CompiledTemplate(template_text)
+    out = []
+    for engine in ("regex", "anchor"):
+        try:
+            out.append(compiled.match(result_text, engine=engine))
+        except ValueError:
+            out.append(None)
+    return out
+
+def test_files():
+    assert parse_with_template(template_file, actual_file, engine="anchor") == \
+        parse_with_template(template_file, actual_file, engine="regex")
+
+def test_cases():
+    cases = [
+        ("a={{ a }};", "a=1;"),
+        ("a={{ a }};", "xx a=1; a=2;"),
+        ("a={{ a }} b={{ b }}", "a=1   b=22"),             # trailing variable takes one char
+        ("{{ a }}:{{ b }}\n", "k:v:w\n"),
+        ("{{ a }}{{ b }}.", "xyz."),                         # adjacent variables
+        ("x {{ a }} y {{ a }} z\n", "x 1 y 2 z\n"),          # repeated variable
+        ("n={{ n }}\nm={{ m }}\n", "n=1\nm=2\n"),
+        ("n={{ n }}\nm={{ m }}\n", "n=1\n\nm=2\n"),
+        ("a={{ a }};", "a=;"),
+        ("a={{ a }};", "b=1;"),
+        ("a={{a}} b={{ b }};", "a={{a}} b=2;"),              # unspaced placeholder stays literal
+        ("p\\n{{ a }} q", "p\\n1 q"),
+    ]
+    for template_text, result_text in cases:
+        regex, anchor = both(template_text, result_text)
+        assert regex == anchor, (template_text, result_text, regex, anchor)
+
+def test_random():
+    rng = random.Random(1234)
+    words = ["#SBATCH", "--nodes=", "srun", "-n", "x", "=", ";", ":", "ab", "a", "\n", " ", "  "]
+    alphabet = "ab=;:x \n-1"
+    misses = 0
+    for _ in range(3000):
+        parts = []
+        for i in range(rng.randint(1, 5)):
+            parts.append("".join(rng.choice(words) for _ in range(rng.randint(0, 3))))
+            parts.append(f"{{{{ v{rng.randint(0, 3)} }}}}")
+        parts.append("".join(rng.choice(words) for _ in range(rng.randint(0, 3))))
+        template_text = "".join(parts)
+
+        # render, sometimes with noise so that some files do not match
+        rendered = []
+        for p in parts:
+            if p.startswith("{{"):
+                rendered.append("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))))
+            else:
+                rendered.append(p)
+        result_text = "".join(rendered)
+        if rng.random() < 0.3:
+            k = rng.randrange(len(result_text) + 1)
+            result_text = result_text[:k] + rng.choice(alphabet) + result_text[k + 1:]
+
+        regex, anchor = both(template_text, result_text)
+        if anchor is None and regex is not None:
+            misses += 1
+            continue
+        assert regex == anchor, (template_text, result_text, regex, anchor)
+    assert misses < 30
+
+def test_fast_failure():
+    template_text = Path(template_file).read_text()
+    result_text = Path(actual_file).read_text().replace("srun", "mpirun")
+    assert both(template_text, result_text) == [None, None]
+
+    # a multi-MB mismatch fails after one forward pass
+    result_text = result_text * 20000
+    compiled = CompiledTemplate(template_text)
+    t0 = time.perf_counter()
+    try:
+        compiled.match(result_text, engine="anchor")
+        assert False, "should not match"
+    except ValueError:
+        pass
+    assert time.perf_counter() - t0 < 1.0
+
+def test_windowed_fallback():
+    # the final "\n" only fits inside the whitespace " " consumed, which the
+    # windowed scan has to find in a multi-MB text without running past it
+    compiled = CompiledTemplate("a={{ a }} {{ b }}\n")
+    text = "a=1  \n" + "x" * (1 << 20)
+    expected = compiled.match(text, engine="regex")
+    assert expected == {"a": "1", "b": ""}
+    for window in (16, 4096, None):
+        assert compiled.match(text, engine="anchor", window=window) == expected
+        assert compiled.match(text.encode(), engine="anchor", window=window) == expected
+    # no newline anywhere: both engines fail
+    text = "a=1  " + "x" * (1 << 20)
+    assert both("a={{ a }} {{ b }}\n", text) == [None, None]
+    try:
+        compiled.match(text, engine="anchor", window=4096)
+        assert False, "should not match"
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    test_files()
+    test_cases()
+    test_random()
+    test_fast_failure()
+    test_windowed_fallback()
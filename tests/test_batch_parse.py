@@ -0,0 +1,46 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import io
+import sys
+import json
+import contextlib
+from metascribe.batch import parse_many
+from metascribe.parser import parse_with_template
+from metascribe.cli import md_parser
+
+template_file = "tests/files/template1.py"
+actual_file = "tests/files/actual1.py"
+
+def test_parse_many():
+    expected = parse_with_template(template_file, actual_file)
+    paths = [actual_file, "tests/files/missing.py", actual_file, "tests/files/test.db"]
+    for workers in (1, 2):
+        records = list(parse_many(template_file, paths, workers=workers, chunksize=1))
+        assert [r["path"] for r in records] == paths
+        assert records[0]["data"] == expected and records[0]["error"] is None
+        assert records[1]["data"] is None and records[1]["error"].startswith("FileNotFoundError")
+        assert records[2]["data"] == expected
+        assert records[3]["error"] is not None
+
+def test_cli_glob():
+    sys.argv = [
+        "md-parser",
+        template_file,
+        "--glob", "tests/files/actual*.py",
+        "--workers", "2",
+    ]
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        md_parser()
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 1
+    rec = json.loads(lines[0])
+    assert rec["path"] == actual_file and rec["nnodes"] == "1"
+
+if __name__ == "__main__":
+    test_parse_many()
+    test_cli_glob()
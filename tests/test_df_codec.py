@@ -0,0 +1,66 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import shutil
+import pandas as pd
+from metascribe.df_codec import CODECS, encode_df, decode_df, value_codec
+from metascribe.rocks_store import RocksStore
+
+df1 = pd.DataFrame({
+    "name": ["Alice", "Bob", "Charlie"],
+    "age": [30, 25, 35],
+    "score": [85.02, 90.08, 78.76],
+    "city": ["New York", "Los Angeles", None],
+}, index=pd.Index(["a", "b", "c"], name="id"))
+
+
+def test_roundtrip():
+    for codec in CODECS:
+        raw = encode_df(df1, codec)
+        assert value_codec(raw) == codec
+        pd.testing.assert_frame_equal(decode_df(raw), df1, check_dtype=False)
+
+        part = decode_df(raw, columns=["score", "name"])
+        assert list(part.columns) == ["score", "name"]
+        assert list(part.index) == ["a", "b", "c"]
+        assert part["score"].tolist() == df1["score"].tolist()
+
+        try:
+            decode_df(raw, columns=["nope"])
+            assert False, "expected missing column error"
+        except (KeyError, ValueError):
+            pass
+
+
+def test_legacy_values():
+    # Values written before codecs existed are bare df.to_parquet() bytes.
+    raw = df1.to_parquet()
+    assert value_codec(raw) == "parquet"
+    pd.testing.assert_frame_equal(decode_df(raw), df1)
+
+
+def test_rocks_codecs():
+    db_path = "tests/files/test_store_codec.rocks"
+    try:
+        with RocksStore(db_path) as store:
+            store.put_df("/legacy", df1)
+            store.put_df("/lz4", df1, codec="ipc-lz4")
+        with RocksStore(db_path, df_codec="ipc-zstd") as store:
+            store.put_df("/zstd", df1)
+            store.put_many({"/many": df1}, kind="df")
+            for key in ("/legacy", "/lz4", "/zstd", "/many"):
+                assert store.get_df(key, columns=["age"])["age"].tolist() == [30, 25, 35]
+            assert value_codec(store._store["/zstd"]) == "ipc-zstd"
+            assert value_codec(store._store["/many"]) == "ipc-zstd"
+            assert store.get_many(["/lz4"], kind="df")["/lz4"].shape == df1.shape
+    finally:
+        shutil.rmtree(db_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_roundtrip()
+    test_legacy_values()
+    test_rocks_codecs()
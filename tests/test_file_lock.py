@@ -0,0 +1,122 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import shutil
+import signal
+import time
+from metascribe.file_lock import FileLock
+from metascribe.rocks_store import RocksStore
+from metascribe.h5_store import H5Store
+
+LOCK_PATH = "tests/files/test_store.lock"
+
+
+def test_shared_and_exclusive():
+    try:
+        with FileLock(LOCK_PATH, shared=True), FileLock(LOCK_PATH, shared=True):
+            # Two readers at once; a writer has to wait for both.
+            try:
+                FileLock(LOCK_PATH, timeout=0.05).acquire()
+                assert False, "expected TimeoutError"
+            except TimeoutError:
+                pass
+        with FileLock(LOCK_PATH, timeout=0.05):
+            try:
+                FileLock(LOCK_PATH, shared=True, timeout=0.05).acquire()
+                assert False, "expected TimeoutError"
+            except TimeoutError as e:
+                assert str(os.getpid()) in str(e)
+    finally:
+        if os.path.exists(LOCK_PATH):
+            os.remove(LOCK_PATH)
+
+
+def _is_locked(path):
+    try:
+        FileLock(path, timeout=0).acquire().release()
+        return False
+    except TimeoutError:
+        return True
+
+
+def test_dead_holder():
+    pid = os.fork()
+    if pid == 0:
+        FileLock(LOCK_PATH).acquire()
+        time.sleep(60)
+        os._exit(0)
+    try:
+        # wait until the child holds the lock, then kill it without cleanup
+        t0 = time.time()
+        while not (os.path.exists(LOCK_PATH) and _is_locked(LOCK_PATH)):
+            assert time.time() - t0 < 10
+            time.sleep(0.01)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        pid = None
+        t0 = time.time()
+        with FileLock(LOCK_PATH, timeout=5):
+            assert time.time() - t0 < 1
+    finally:
+        if pid is not None:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        if os.path.exists(LOCK_PATH):
+            os.remove(LOCK_PATH)
+
+
+def test_rocks_readers_beside_writer():
+    db_path = "tests/files/test_store_readers.rocks"
+    secondary = "tests/files/test_store_readers.secondary"
+    try:
+        with RocksStore(db_path, lock=True) as writer:
+            writer.put_string("/a", "1")
+            writer._store.flush()
+            # Neither reader waits for the writer's lock.
+            with RocksStore(db_path, lock=True, lock_timeout=0.1, read_only=True) as ro, \
+                 RocksStore(db_path, secondary_path=secondary) as sec:
+                assert ro.get_string("/a") == "1"
+                assert sec.get_string("/a") == "1"
+                writer.put_string("/b", "2")
+                sec.catch_up()
+                assert sec.get_string("/b") == "2"
+                try:
+                    ro.put_string("/c", "3")
+                    assert False, "expected read-only failure"
+                except Exception:
+                    pass
+    finally:
+        shutil.rmtree(db_path, ignore_errors=True)
+        shutil.rmtree(secondary, ignore_errors=True)
+        if os.path.exists(f"{db_path}.lock"):
+            os.remove(f"{db_path}.lock")
+
+
+def test_h5_shared_readers():
+    h5_path = "tests/files/test_store_readers.h5"
+    try:
+        with H5Store(h5_path, mode='w', lock=True) as store:
+            store.put_string("/a", "1")
+        with H5Store(h5_path, mode='r', lock=True, lock_timeout=0.1) as r1, \
+             H5Store(h5_path, mode='r', lock=True, lock_timeout=0.1) as r2:
+            assert r1.get_string("/a") == r2.get_string("/a") == "1"
+            try:
+                H5Store(h5_path, mode='a', lock=True, lock_timeout=0.1)
+                assert False, "expected TimeoutError"
+            except TimeoutError:
+                pass
+    finally:
+        for p in (h5_path, f"{h5_path}.lock"):
+            if os.path.exists(p):
+                os.remove(p)
+
+
+if __name__ == "__main__":
+    test_shared_and_exclusive()
+    test_dead_holder()
+    test_rocks_readers_beside_writer()
+    test_h5_shared_readers()
@@ -0,0 +1,78 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+from metascribe.follow import IncrementalParser, follow
+from metascribe.records import RecordTemplate
+
+log_file = "tests/files/follow.log"
+state_file = "tests/files/follow_state.json"
+
+def cleanup():
+    for p in (log_file, state_file):
+        if os.path.exists(p):
+            os.remove(p)
+
+def append(text):
+    with open(log_file, "a") as f:
+        f.write(text)
+
+def test_incremental():
+    cleanup()
+    try:
+        rt = RecordTemplate("step {{ step }} loss {{ loss }}\n")
+        parser = IncrementalParser(rt, state_path=state_file, types={"step": "int64"})
+        append("start\nstep 1 loss 0.9\nstep 2 loss 0.8\nstep 3 lo")
+        assert parser.poll(log_file).column("step").to_pylist() == [1, 2]
+        assert parser.poll(log_file).num_rows == 0
+
+        append("ss 0.7\n")
+        assert parser.poll(log_file).column("step").to_pylist() == [3]
+
+        # a new parser resumes from the persisted offset
+        append("step 4 loss 0.6\n")
+        parser = IncrementalParser(rt, state_path=state_file, types={"step": "int64"})
+        assert parser.poll(log_file).column("step").to_pylist() == [4]
+
+        # truncated/rotated files start over
+        os.remove(log_file)
+        append("step 1 loss 1.0\n")
+        assert parser.poll(log_file).column("step").to_pylist() == [1]
+    finally:
+        cleanup()
+
+def test_multiline_record():
+    cleanup()
+    try:
+        rt = RecordTemplate("== iter {{ i }}\nbw: {{ bw }}\n")
+        parser = IncrementalParser(rt)
+        append("== iter 1\nbw: 10\n== iter 2\n")
+        assert parser.poll(log_file).column("i").to_pylist() == ["1"]
+        append("bw: 20\n")
+        assert parser.poll(log_file).to_pydict() == {"i": ["2"], "bw": ["20"]}
+    finally:
+        cleanup()
+
+def test_follow():
+    cleanup()
+    try:
+        append("step 1 loss 0.9\n")
+        parser = IncrementalParser(RecordTemplate("step {{ step }} loss {{ loss }}\n"))
+        polls = []
+        def stop():
+            polls.append(1)
+            if len(polls) == 1:
+                append("step 2 loss 0.8\n")
+            return len(polls) > 2
+        seen = [t.column("step").to_pylist() for _, t in follow(parser, [log_file], interval=0.05, stop=stop)]
+        assert seen == [["1"], ["2"]]
+    finally:
+        cleanup()
+
+if __name__ == "__main__":
+    test_incremental()
+    test_multiline_record()
+    test_follow()
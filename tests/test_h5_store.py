@@ -47,9 +47,95 @@ def test_read_json():
         json_read = store.get_json("/configs/run1")
         print(json_read)
 
+def test_append_select():
+    import os
+    import numpy as np
+    h5_path = "tests/files/test_store_append.h5"
+    try:
+        with H5Store(h5_path, mode='w', lock=True) as store:
+            for day in range(5):
+                log = pd.DataFrame({
+                    "ts": np.arange(day * 1000, (day + 1) * 1000),
+                    "host": [f"n{i % 4}" for i in range(1000)],
+                    "value": np.linspace(0, 1, 1000),
+                })
+                store.append_df("/activity_log/x", log, index_columns=["ts", "host"],
+                                min_itemsize={"host": 16})
+
+        with H5Store(h5_path, mode='r', lock=True) as store:
+            sel = store.select("/activity_log/x", where="ts >= 2500 & host == 'n1'",
+                               columns=["ts", "value"])
+            assert list(sel.columns) == ["ts", "value"]
+            assert len(sel) == 625 and sel["ts"].min() >= 2500
+
+            chunks = list(store.iter_df("/activity_log/x", chunksize=1200))
+            assert [len(c) for c in chunks] == [1200, 1200, 1200, 1200, 200]
+            assert pd.concat(chunks)["ts"].tolist() == list(range(5000))
+            assert len(store.get_df("/activity_log/x")) == 5000
+            try:
+                store.select("/activity_log/missing")
+                assert False, "expected KeyError"
+            except KeyError:
+                pass
+    finally:
+        for p in (h5_path, f"{h5_path}.lock"):
+            if os.path.exists(p):
+                os.remove(p)
+
+def test_compact_objects():
+    import os
+    h5_path = "tests/files/test_store_objects.h5"
+    try:
+        with H5Store(h5_path, mode='w') as store:
+            store.put_json("/configs/legacy", json1)
+        with H5Store(h5_path, mode='a', compact_objects=True) as store:
+            configs = {f"/configs/run{i}": dict(json1, seed=i) for i in range(100)}
+            assert store.put_many_json(configs) == 100
+            store.put_json("/configs/run5", {"replaced": True})
+            store.put_string("/names/ünï", "välue")
+            store.put_df("/activity_log/x/y", df1)
+            assert store.get_json("/configs/run5") == {"replaced": True}
+
+        with H5Store(h5_path, mode='r', compact_objects=True) as store:
+            assert store.get_json("/configs/run7")["seed"] == 7
+            assert store.get_json("/configs/run5") == {"replaced": True}
+            assert store.get_json("/configs/legacy") == json1
+            assert store.get_string("/names/ünï") == "välue"
+            got = store.get_many_json(["/configs/run1", "/configs/legacy", "/configs/missing"])
+            assert got == {"/configs/run1": dict(json1, seed=1), "/configs/legacy": json1}
+            assert len(store.object_keys("/configs/")) == 100
+            assert store.object_keys("/names") == ["/names/ünï"]
+            assert store.get_df("/activity_log/x/y").equals(df1)
+            try:
+                store.get_json("/configs/missing")
+                assert False, "expected KeyError"
+            except KeyError:
+                pass
+
+        # mixing modes: the newest write wins, packed or not
+        with H5Store(h5_path, mode='a', compact_objects=True) as store:
+            store.put_string("/names/plain", "packed")
+        with H5Store(h5_path, mode='a') as store:
+            store.put_json("/configs/run1", {"v": 2})
+            store.put_string("/names/plain", "newer")
+        with H5Store(h5_path, mode='r', compact_objects=True) as store:
+            assert store.get_json("/configs/run1") == {"v": 2}
+            assert store.get_string("/names/plain") == "newer"
+            assert store.get_many_json(["/configs/run1"]) == {"/configs/run1": {"v": 2}}
+            assert "/configs/run1" not in store.object_keys("/configs/")
+        with H5Store(h5_path, mode='a', compact_objects=True) as store:
+            store.put_json("/configs/run1", {"v": 3})
+        with H5Store(h5_path, mode='r') as store:
+            assert store.get_json("/configs/run1") == {"v": 3}
+            assert store.get_many_json(["/configs/run1"]) == {"/configs/run1": {"v": 3}}
+    finally:
+        if os.path.exists(h5_path):
+            os.remove(h5_path)
+
 if __name__ == "__main__":
     test_write_df()
     test_read_df()
     test_write_json()
     test_read_json()
-    
\ No newline at end of file
+    test_append_select()
+    test_compact_objects()
@@ -0,0 +1,149 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import sys
+import socket
+import sqlite3
+import threading
+from metascribe.cli import md_store
+from metascribe.ingestd import IngestServer, send_record
+
+socket_path = "tests/files/test_ingestd.sock"
+sql_path = os.path.abspath("tests/files/test_ingestd.db")
+
+def cleanup():
+    for path in (socket_path, sql_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+def test_group_commit():
+    cleanup()
+    try:
+        with IngestServer(socket_path) as server:
+            replies = []
+            def client(i):
+                replies.append(send_record(socket_path, {
+                    "sql_path": sql_path, "table": "jobs", "pk": "jobid",
+                    "kv": {"jobid": i, "nnodes": i % 4},
+                }))
+            threads = [threading.Thread(target=client, args=(i,)) for i in range(64)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert replies == [{"ok": True}] * 64
+            assert server.records == 64 and server.commits <= 64
+
+            # a bad record fails alone, not the records committed with it
+            replies = {}
+            def mixed(i):
+                kv = {"jobid": 100 + i, "nnodes": 1}
+                if i == 3:
+                    kv["my-col"] = 1  # what --kv_my-col=1 produces
+                if i == 4:
+                    kv["nnodes"] = [1, 2]
+                replies[i] = send_record(socket_path, {"sql_path": sql_path, "table": "jobs",
+                                                       "pk": "jobid", "kv": kv})
+            server.max_delay = 0.5  # commit all eight together
+            threads = [threading.Thread(target=mixed, args=(i,)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            server.max_delay = 0.0
+            assert [i for i in range(8) if not replies[i]["ok"]] == [3, 4]
+
+            # the compiled template is kept between requests
+            for jobid in (1, 2):
+                reply = send_record(socket_path, {
+                    "sql_path": sql_path, "table": "parsed", "pk": "jobid", "kv": {"jobid": jobid},
+                    "template": os.path.abspath("tests/files/template1.py"),
+                    "file": os.path.abspath("tests/files/actual1.py"),
+                })
+                assert reply == {"ok": True}
+            assert server.cache.hits == 1 and server.cache.misses == 1
+
+            reply = send_record(socket_path, {"sql_path": sql_path, "table": "parsed",
+                                              "template": "tests/files/nope.py", "file": "tests/files/nope.py"})
+            assert not reply["ok"] and "Error parsing files" in reply["error"]
+            assert not send_record(socket_path, {"table": "jobs"})["ok"]
+
+            # a second daemon cannot take over a live socket
+            try:
+                IngestServer(socket_path).start()
+                assert False, "expected IOError"
+            except IOError:
+                pass
+        assert not os.path.exists(socket_path)
+
+        con = sqlite3.connect(sql_path)
+        assert con.execute("SELECT COUNT(*), SUM(nnodes) FROM jobs WHERE jobid < 100").fetchone() == (64, 96)
+        assert [r[0] for r in con.execute("SELECT jobid FROM jobs WHERE jobid >= 100 ORDER BY jobid")] == \
+            [100, 101, 102, 105, 106, 107]
+        assert con.execute("SELECT jobid, partition FROM parsed").fetchall() == [(1, "xxx"), (2, "xxx")]
+        con.close()
+    finally:
+        cleanup()
+
+def test_md_store_client():
+    cleanup()
+    argv = sys.argv
+    try:
+        def run(jobid):
+            sys.argv = [
+                "md-store",
+                "--table", "metadata4",
+                "--sql_path", sql_path,
+                "--socket", socket_path,
+                "--template", "tests/files/template1.py",
+                "--file", "tests/files/actual1.py",
+                f"--kv_jobid={jobid}",
+                "--pk=jobid",
+            ]
+            md_store()
+
+        with IngestServer(socket_path) as server:
+            run(1)
+            assert server.records == 1
+        # no daemon listening: the record is written directly
+        run(2)
+        # a socket left behind by a daemon that died is replaced
+        open(socket_path, "w").close()
+        run(3)
+        with IngestServer(socket_path) as server:
+            run(3)
+            assert server.records == 1
+
+        # once the request is sent, a lost reply is an error, not a second write
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(socket_path)
+        listener.listen()
+        def drop_reply():
+            conn, _ = listener.accept()
+            conn.makefile("rb").readline()
+            conn.close()
+        t = threading.Thread(target=drop_reply)
+        t.start()
+        try:
+            run(4)
+            assert False, "expected SystemExit"
+        except SystemExit:
+            pass
+        t.join()
+        listener.close()
+
+        con = sqlite3.connect(sql_path)
+        assert con.execute("SELECT jobid, partition FROM metadata4 ORDER BY jobid").fetchall() == \
+            [(1, "xxx"), (2, "xxx"), (3, "xxx")]
+        con.close()
+    finally:
+        sys.argv = argv
+        cleanup()
+
+if __name__ == "__main__":
+    test_group_commit()
+    test_md_store_client()
@@ -0,0 +1,379 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+#
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import json
+import shutil
+from pathlib import Path
+import pandas as pd
+import pyarrow.parquet as pq
+import sys
+from metascribe.parquet_store import (ParquetStoreWriter, ParquetStoreReader, parquet_read,
+                                      shard_files, load_schema_registry, MANIFEST)
+from metascribe.parquet_compact import compact
+from metascribe.cli import md_compact
+
+STORE_ROOT = "tests/files/test_store.parquet"
+
+df1 = pd.DataFrame([
+    {"name": "Alice", "age": 30, "score": 85.02},
+    {"name": "Bob",   "age": 25, "score": 90.08},
+])
+
+
+def test_manifest_pruning():
+    try:
+        # two writers with disjoint namespaces, several shards each
+        for ns in ("exp_a", "exp_b"):
+            w = ParquetStoreWriter(STORE_ROOT, table_shard_rows=4, obj_shard_rows=3)
+            for i in reversed(range(6)):
+                w.add_table(f"/{ns}/run{i}/log", df1)
+                w.put_object(f"/{ns}/run{i}/config", {"seed": i}, ts=i)
+            w.close()
+
+            manifest = json.loads((w.objects_dir / MANIFEST).read_text())
+            assert [e["rows"] for e in manifest["shards"]] == [3, 3]
+            for e in manifest["shards"]:
+                keys = pq.read_table(w.objects_dir / e["file"]).column("key").to_pylist()
+                assert keys == sorted(keys)
+                assert (e["key_min"], e["key_max"]) == (keys[0], keys[-1])
+
+        objects = Path(STORE_ROOT) / "objects"
+        assert len(shard_files(objects)) == 4
+        assert len(shard_files(objects, "/exp_a/")) == 2
+        assert len(shard_files(objects, "/exp_a/run5")) == 1
+        assert shard_files(objects, "/exp_c/") == []
+
+        tables, objs = parquet_read(STORE_ROOT, "/exp_b/run2")
+        assert list(tables) == ["/exp_b/run2/log"]
+        assert tables["/exp_b/run2/log"][list(df1.columns)].equals(df1)
+        assert objs == [("/exp_b/run2/config", {"seed": 2})]
+        assert parquet_read(STORE_ROOT, "/nothing/") == ({}, [])
+
+        # shards without a manifest entry (legacy writers) are always read
+        legacy = objects / "writer=legacy"
+        legacy.mkdir()
+        pd.DataFrame([{"key": "/exp_a/old", "kind": "json", "ts": 0.0, "json": "{}"}]) \
+            .to_parquet(legacy / "shard-000001.parquet")
+        assert len(shard_files(objects, "/exp_b/")) == 3
+        _, objs = parquet_read(STORE_ROOT, "/exp_a/old")
+        assert objs == [("/exp_a/old", {})]
+    finally:
+        shutil.rmtree(STORE_ROOT, ignore_errors=True)
+
+
+def test_compaction():
+    try:
+        for job in range(6):
+            w = ParquetStoreWriter(STORE_ROOT)
+            w.add_table(f"/exp/run{job}/log", df1)
+            w.put_object("/exp/config", {"job": job}, ts=job)
+            w.put_object(f"/exp/run{job}/config", {"seed": job}, ts=job)
+            w.close()
+        before = parquet_read(STORE_ROOT, "/exp/")
+        objects = Path(STORE_ROOT) / "objects"
+        old_files = shard_files(objects)
+        assert len(old_files) == 6
+
+        # a writer that is still running keeps appending during compaction
+        live = ParquetStoreWriter(STORE_ROOT)
+        stats = compact(STORE_ROOT, min_age=0, target_shard_rows=6, row_group_rows=2)
+        assert stats["objects"]["inputs"] == 6 and stats["objects"]["rows"] == 7
+        assert stats["tables"]["inputs"] == 6 and stats["tables"]["rows"] == 12
+        live.put_object("/exp/config", {"job": "live"}, ts=100)
+        live.close()
+
+        files = shard_files(objects)
+        assert not set(files) & set(old_files)
+        assert all(Path(f).exists() for f in old_files)  # kept for the grace period
+        assert len(files) == 3  # two compacted shards + the live writer's
+        for f in files[:2]:
+            keys = pq.read_table(f).column("key").to_pylist()
+            assert keys == sorted(keys)
+
+        tables, objs = parquet_read(STORE_ROOT, "/exp/")
+        assert tables.keys() == before[0].keys()
+        for k in tables:
+            assert tables[k][list(df1.columns)].equals(df1)
+        # only the newest /exp/config survives compaction (plus the live one)
+        assert [o for k, o in objs if k == "/exp/config"] == [{"job": 5}, {"job": "live"}]
+
+        # compacting the compacted output again, then purging everything replaced
+        stats = compact(STORE_ROOT, min_age=0, grace_period=0)
+        stats = compact(STORE_ROOT, min_age=0, grace_period=0)
+        assert not any(Path(f).exists() for f in old_files)
+        assert parquet_read(STORE_ROOT, "/exp/run3/")[1] == [("/exp/run3/config", {"seed": 3})]
+        tables, objs = parquet_read(STORE_ROOT, "/exp/")
+        assert len(tables) == 6
+        assert [o for k, o in objs if k == "/exp/config"] == [{"job": "live"}]
+
+        argv = sys.argv
+        sys.argv = ["md-compact", STORE_ROOT, "--min_age=0", "--datasets", "objects"]
+        try:
+            md_compact()
+        finally:
+            sys.argv = argv
+    finally:
+        shutil.rmtree(STORE_ROOT, ignore_errors=True)
+
+
+def test_reader():
+    try:
+        w = ParquetStoreWriter(STORE_ROOT, obj_shard_rows=50)
+        for i in range(120):
+            w.put_object(f"/exp/run{i:03d}/config", {"seed": i, "tags": ["a", i]}, ts=i)
+        w.put_object("/exp/run007/config", {"seed": "new"}, ts=1000)
+        w.add_table("/exp/run001/log", df1)
+        w.close()
+
+        with ParquetStoreReader(STORE_ROOT) as reader:
+            assert reader.get_object("/exp/run007/config") == {"seed": "new"}
+            assert reader.get_object("/exp/run100/config") == {"seed": 100, "tags": ["a", 100]}
+            assert reader.get_table("/exp/run001/log").equals(df1)
+            for get, key in ((reader.get_object, "/exp/nope"), (reader.get_table, "/exp/nope")):
+                try:
+                    get(key)
+                    assert False, "expected KeyError"
+                except KeyError:
+                    pass
+
+            pairs = list(reader.scan("/exp/run00", batch_size=4))
+            assert [k for k, _ in pairs] == sorted(k for k, _ in pairs)
+            assert len(pairs) == 11  # run007 has two versions
+            assert dict(reader.scan("/exp/run00", latest=True))["/exp/run007/config"] == {"seed": "new"}
+            batches = list(reader.scan("/exp/", decode=False, batch_size=32))
+            assert sum(b.num_rows for b in batches) == 121
+            assert max(b.num_rows for b in batches) <= 32
+            assert [b.num_rows for b in reader.scan("/exp/", dataset="tables")] == [2]
+            assert list(reader.scan("/nothing/")) == []
+            # lookups and scans never bind the ad-hoc views
+            assert reader.con.execute("SELECT count(*) FROM duckdb_views() WHERE NOT internal").fetchone() == (0,)
+            assert reader.views().execute("SELECT count(*) FROM objects").fetchone() == (121,)
+
+            # new shards show up after refresh()
+            w = ParquetStoreWriter(STORE_ROOT)
+            w.put_object("/exp/late", {"late": True})
+            w.close()
+            reader.refresh()
+            assert reader.get_object("/exp/late") == {"late": True}
+    finally:
+        shutil.rmtree(STORE_ROOT, ignore_errors=True)
+
+
+def test_background_flush():
+    import time
+    try:
+        # byte trigger: ~100 byte objects, 1 kB buffers -> several shards
+        w = ParquetStoreWriter(STORE_ROOT, background=True, max_buffer_bytes=1000)
+        for i in range(100):
+            w.put_object(f"/bytes/{i:03d}", {"payload": "x" * 60})
+        w.close()
+        assert len(w._manifests[w.objects_dir]) >= 8
+        assert len(parquet_read(STORE_ROOT, "/bytes/")[1]) == 100
+
+        # age trigger: the flush thread writes an idle buffer without close()
+        w = ParquetStoreWriter(STORE_ROOT, background=True, max_buffer_age=0.2)
+        w.put_object("/age/a", {"a": 1})
+        w.add_table("/age/t", df1)
+        t0 = time.time()
+        while len(shard_files(Path(STORE_ROOT) / "objects", "/age/")) < 1:
+            assert time.time() - t0 < 5
+            time.sleep(0.05)
+        w.close()
+        tables, objs = parquet_read(STORE_ROOT, "/age/")
+        assert objs == [("/age/a", {"a": 1})] and list(tables) == ["/age/t"]
+
+        # backpressure: at most max_pending buffers wait for a slow flusher
+        class SlowWriter(ParquetStoreWriter):
+            pending_peak = 0
+
+            def _write_objects(self, shard_id, rows):
+                SlowWriter.pending_peak = max(SlowWriter.pending_peak, self._queue.qsize())
+                time.sleep(0.05)
+                super()._write_objects(shard_id, rows)
+
+        w = SlowWriter(STORE_ROOT, background=True, obj_shard_rows=1, max_pending=2)
+        t0 = time.time()
+        for i in range(8):
+            w.put_object(f"/slow/{i}", {"i": i})
+        assert time.time() - t0 > 0.2  # the producer was held back
+        w.close()
+        assert SlowWriter.pending_peak <= 2
+        assert len(parquet_read(STORE_ROOT, "/slow/")[1]) == 8
+
+        # flush thread errors surface in the producer
+        class BrokenWriter(ParquetStoreWriter):
+            def _write_objects(self, shard_id, rows):
+                raise OSError("disk full")
+
+        w = BrokenWriter(STORE_ROOT, background=True, obj_shard_rows=1)
+        w.put_object("/broken/a", {})
+        try:
+            w.close()
+            assert False, "expected IOError"
+        except IOError as e:
+            assert "disk full" in str(e)
+        assert w._thread is None  # stopped despite the error
+
+        # rows flushed after an earlier failure are still written
+        class FlakyWriter(ParquetStoreWriter):
+            failed = False
+
+            def _write_objects(self, shard_id, rows):
+                if not FlakyWriter.failed:
+                    FlakyWriter.failed = True
+                    raise OSError("disk full")
+                super()._write_objects(shard_id, rows)
+
+        w = FlakyWriter(STORE_ROOT, background=True, obj_shard_rows=1)
+        w.put_object("/flaky/a", {})
+        t0 = time.time()
+        while w._error is None:
+            assert time.time() - t0 < 5
+            time.sleep(0.01)
+        try:
+            w.put_object("/flaky/b", {})
+            assert False, "expected IOError"
+        except IOError:
+            pass
+        w.close()
+        assert parquet_read(STORE_ROOT, "/flaky/")[1] == [("/flaky/b", {})]
+    finally:
+        shutil.rmtree(STORE_ROOT, ignore_errors=True)
+
+
+def test_schema_partitions():
+    try:
+        df2 = pd.DataFrame([{"host": "n1", "ts": 1.5, "ok": True}])
+        w = ParquetStoreWriter(STORE_ROOT)
+        w.add_table("/exp/run0/log", df1)
+        w.add_table("/exp/run0/hosts", df2)
+        w.add_table("/exp/run1/log", df1)
+        w.close()
+
+        tables_dir = Path(STORE_ROOT) / "tables"
+        registry = load_schema_registry(tables_dir)
+        assert len(registry) == 2
+        assert sorted(d.name for d in tables_dir.glob("schema=*")) == \
+            sorted(f"schema={fp}" for fp in registry)
+        hosts_fp = next(fp for fp, cols in registry.items() if cols[2][0] == "host")
+        assert [c for c, _ in registry[hosts_fp]] == ["key", "row", "host", "ts", "ok"]
+        # each partition's shards hold only that schema's columns
+        for fp in registry:
+            shards = shard_files(tables_dir / f"schema={fp}")
+            assert len(shards) == 1
+            assert pq.read_schema(shards[0]).names == [c for c, _ in registry[fp]]
+
+        # tables written before schema partitioning are still read
+        legacy = tables_dir / "writer=legacy"
+        legacy.mkdir()
+        pd.DataFrame([{"key": "/exp/run2/log", "row": 0, "name": "Carol", "age": 41, "score": 70.5}]) \
+            .to_parquet(legacy / "shard-000001.parquet")
+        assert len(shard_files(tables_dir, "/exp/")) == 3
+
+        with ParquetStoreReader(STORE_ROOT) as reader:
+            assert reader.schemas() == registry
+            hosts = reader.get_table("/exp/run0/hosts")
+            assert hosts.equals(df2) and hosts["ok"].dtype == bool
+            assert reader.get_table("/exp/run0/hosts", schema=hosts_fp).equals(df2)
+            try:
+                reader.get_table("/exp/run0/log", schema=hosts_fp)
+                assert False, "expected KeyError"
+            except KeyError:
+                pass
+            assert reader.get_table("/exp/run2/log")["name"].tolist() == ["Carol"]
+            assert sum(b.num_rows for b in reader.scan("/exp/", dataset="tables")) == 6
+
+            # a partition compacted and purged after the listing is listed again,
+            # even when the partitions queried before it are still intact
+            w = ParquetStoreWriter(STORE_ROOT)
+            w.add_table("/exp/run1/hosts", df2)
+            w.close()
+            reader.refresh()
+            compact(STORE_ROOT, datasets=("tables",), min_age=0, grace_period=0)
+            compact(STORE_ROOT, datasets=("tables",), min_age=0, grace_period=0)
+            assert sum(b.num_rows for b in reader.scan("/exp/", dataset="tables")) == 7
+            assert reader.get_table("/exp/run1/hosts").equals(df2)
+
+        tables, _ = parquet_read(STORE_ROOT, "/exp/")
+        assert sorted(tables) == ["/exp/run0/hosts", "/exp/run0/log", "/exp/run1/hosts",
+                                "/exp/run1/log", "/exp/run2/log"]
+        assert tables["/exp/run0/hosts"].equals(df2)
+        assert tables["/exp/run1/log"].equals(df1)
+    finally:
+        shutil.rmtree(STORE_ROOT, ignore_errors=True)
+
+
+def test_object_fields():
+    try:
+        fields = {"model.type": "string", "batch_size": "int64", "lr": "float64"}
+        w = ParquetStoreWriter(STORE_ROOT, obj_shard_rows=10, object_fields=fields)
+        for i in range(30):
+            w.put_object(f"/exp/run{i:02d}/config", {
+                "model": {"type": "transformer" if i % 3 == 0 else "cnn"},
+                "batch_size": 32 * (i % 4), "lr": 0.1 if i % 2 else 1,
+            }, ts=i)
+        # a newer version stops matching; wrong types and missing paths are null
+        w.put_object("/exp/run00/config", {"model": {"type": "rnn"}, "batch_size": 96}, ts=100)
+        w.put_object("/exp/bad/config", {"model": "x", "batch_size": "64", "lr": True}, ts=100)
+        w.put_object("/exp/huge/config", {"batch_size": 2**64, "lr": 10**400}, ts=100)
+        w.close()
+        shard = shard_files(Path(STORE_ROOT) / "objects")[0]
+        assert pq.read_schema(shard).field("batch_size").type == "int64"
+        manifest = json.loads((w.objects_dir / MANIFEST).read_text())
+        assert manifest["shards"][0]["fields"] == list(fields)
+
+        # shards written without the fields are skipped for filters on them
+        w = ParquetStoreWriter(STORE_ROOT)
+        w.put_object("/exp/run99/config", {"model": {"type": "transformer"}, "batch_size": 64})
+        w.close()
+
+        with ParquetStoreReader(STORE_ROOT) as reader:
+            query = [("model.type", "==", "transformer"), ("batch_size", ">=", 64)]
+            assert reader.find(query) == ["/exp/run03/config", "/exp/run06/config",
+                                          "/exp/run15/config", "/exp/run18/config",
+                                          "/exp/run27/config"]
+            assert "/exp/run00/config" not in reader.find([("model.type", "==", "transformer")])
+            assert "/exp/run00/config" in reader.find([("model.type", "==", "transformer")], latest=False)
+            assert reader.find([("model.type", "==", "rnn"), ("lr", "==", 0.1)]) == []
+            assert reader.find([("batch_size", "in", [0, 96])], prefix="/exp/run0") == \
+                [f"/exp/run0{i}/config" for i in (0, 3, 4, 7, 8)]
+            assert reader.find([("batch_size", "in", [])]) == []
+            assert reader.find([("lr", "<", 0.5), ("ts", ">=", 29)]) == ["/exp/run29/config"]
+            assert reader.find([("model.type", "==", "x")]) == []
+            assert reader.find([("nope", "==", 1)]) == []
+            # out-of-range numbers are stored as null, next to the raw JSON
+            assert reader.get_object("/exp/huge/config")["batch_size"] == 2**64
+            assert reader.find([("batch_size", ">", 96)]) == []
+
+            objs = dict(reader.scan("/exp/", filters=query, latest=True))
+            assert objs["/exp/run06/config"] == {"model": {"type": "transformer"}, "batch_size": 64, "lr": 1}
+            assert len(objs) == 5
+            try:
+                reader.find([("lr", "~", 1)])
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+
+        # compacted shards keep the fields
+        compact(STORE_ROOT, datasets=("objects",), min_age=0)
+        with ParquetStoreReader(STORE_ROOT) as reader:
+            assert len(reader.find(query)) == 5
+        try:
+            ParquetStoreWriter(STORE_ROOT, object_fields={"ts": "float64"})
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    finally:
+        shutil.rmtree(STORE_ROOT, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_manifest_pruning()
+    test_compaction()
+    test_reader()
+    test_background_flush()
+    test_schema_partitions()
+    test_object_fields()
@@ -0,0 +1,53 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import pyarrow as pa
+from metascribe.records import RecordTemplate, extract_records, iter_record_batches
+
+log_file = "tests/files/records.log"
+
+def write_log(n):
+    with open(log_file, "w") as f:
+        f.write("=== job 42 ===\n")
+        for i in range(n):
+            f.write(f"iter {i}: bandwidth {1000 + i * 0.5} MiB/s\n")
+            if i % 100 == 0:
+                f.write("WARNING: something unrelated\n")
+        f.write("done\n")
+
+def test_extract():
+    write_log(1000)
+    try:
+        rt = RecordTemplate("iter {{ i }}: bandwidth {{ bw }} MiB/s")
+        table = extract_records(rt, log_file, types={"i": "int64", "bw": pa.float64()}, batch_size=64)
+        assert table.num_rows == 1000
+        assert table.schema.names == ["i", "bw"]
+        assert table.column("i").type == pa.int64()
+        assert table.column("i").to_pylist()[:3] == [0, 1, 2]
+        assert table.column("bw").to_pylist()[-1] == 1000 + 999 * 0.5
+
+        batches = list(iter_record_batches(rt, log_file, batch_size=300))
+        assert [b.num_rows for b in batches] == [300, 300, 300, 100]
+    finally:
+        os.remove(log_file)
+
+def test_line_anchoring():
+    # leading and trailing variables stay within their line
+    rt = RecordTemplate("{{ name }} = {{ value }}")
+    table = rt.extract("a = 1\nbb = two words\n\nc = 3")
+    assert table.to_pydict() == {"name": ["a", "bb", "c"], "value": ["1", "two words", "3"]}
+
+def test_repeated_variable_and_empty():
+    rt = RecordTemplate("t={{ t }} t={{ t }};")
+    assert rt.extract("t=1 t=2;\nt=3 t=4;\n").to_pydict() == {"t": ["2", "4"]}
+    empty = rt.extract(b"nothing here")
+    assert empty.num_rows == 0 and empty.schema.names == ["t"]
+
+if __name__ == "__main__":
+    test_extract()
+    test_line_anchoring()
+    test_repeated_variable_and_empty()
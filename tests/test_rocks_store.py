@@ -46,11 +46,114 @@ def test_read_json():
         logging.info(f"Opened Rocks store at {db_path}")
         json_read = store.get_json("/configs/run1")
         print(json_read)
+
+
+def test_prefix_scans():
+    import shutil
+    db_path = "tests/files/test_store_scan.rocks"
+    try:
+        with RocksStore(db_path) as store:
+            for i in range(20):
+                store.put_string(f"/exp{i % 2}/run{i:03d}", str(i))
+            store.put_string("/exp", "root")
+            store.put_string("/exq/a", "other")
+
+            keys = list(store.keys_with_prefix("/exp0/"))
+            assert keys == [f"/exp0/run{i:03d}" for i in range(0, 20, 2)]
+
+            # Prefix shorter than the extractor length -> total order seek.
+            assert len(list(store.keys_with_prefix("/ex"))) == 22
+            assert list(store.keys_with_prefix("/nothing")) == []
+
+            items = dict(store.items_with_prefix("/exp1/run01"))
+            assert items == {"/exp1/run011": "11", "/exp1/run013": "13",
+                             "/exp1/run015": "15", "/exp1/run017": "17",
+                             "/exp1/run019": "19"}
+
+            scan = list(store.range("/exp0/run004", "/exp0/run010"))
+            assert scan == [("/exp0/run004", "4"), ("/exp0/run006", "6"),
+                            ("/exp0/run008", "8")]
+            assert [k for k, _ in store.range("/exq")] == ["/exq/a"]
+            assert len(list(store.range())) == 22
+    finally:
+        shutil.rmtree(db_path, ignore_errors=True)
         
+def test_put_get_many():
+    import shutil
+    db_path = "tests/files/test_store_many.rocks"
+    try:
+        with RocksStore(db_path) as store:
+            configs = {f"/configs/run{i}": dict(json1, seed=i) for i in range(25)}
+            assert store.put_many(configs, batch_size=10) == 25
+            assert store.put_many([("/tables/a", df1)], kind="df", disable_wal=True) == 1
+            store.put_many({"/names/x": "x"}, kind="string")
+
+            got = store.get_many(["/configs/run3", "/configs/missing", "/configs/run24"])
+            assert got == {"/configs/run3": configs["/configs/run3"],
+                           "/configs/run24": configs["/configs/run24"]}
+            assert store.get_json("/configs/run7")["seed"] == 7
+            assert store.get_many(["/tables/a"], kind="df")["/tables/a"].equals(df1)
+            assert list(store.iter_many(["/names/x"], kind="string")) == [("/names/x", "x")]
+
+            try:
+                store.get_string("/names/missing")
+                assert False, "expected KeyError"
+            except KeyError:
+                pass
+    finally:
+        shutil.rmtree(db_path, ignore_errors=True)
+
+def test_column_families():
+    import shutil
+    db_path = "tests/files/test_store_cf.rocks"
+    families = {"configs": "small",
+                "/activity_log": {"compression": "zstd", "min_blob_size": 1024}}
+    try:
+        with RocksStore(db_path, column_families=families) as store:
+            store.put_json("/configs/run1", json1)
+            store.put_df("/activity_log/x/y", df1)
+            store.put_string("/other/a", "a")
+            store.put_many({"/configs/run2": json1, "/misc": {"k": 1}})
+            # routed to the namespace's family, not the default one
+            assert store._store.get("/configs/run1") is None
+            assert store._families["configs"].get("/configs/run2") is not None
+            assert store._families["activity_log"].get("/activity_log/x/y") is not None
+
+        # families are rediscovered from the DB without the mapping
+        with RocksStore(db_path, read_only=True) as store:
+            assert store.get_json("/configs/run1") == json1
+            assert store.get_df("/activity_log/x/y").equals(df1)
+            got = store.get_many(["/misc", "/configs/run2", "/configs/nope"])
+            assert got == {"/misc": {"k": 1}, "/configs/run2": json1}
+            assert list(store.keys_with_prefix("/configs/")) == ["/configs/run1", "/configs/run2"]
+            assert list(store.keys_with_prefix("/")) == ["/activity_log/x/y", "/configs/run1",
+                                                         "/configs/run2", "/misc", "/other/a"]
+            assert list(store.keys_with_prefix("/co")) == ["/configs/run1", "/configs/run2"]
+            assert [k for k, _ in store.range("/b", "/n")] == ["/configs/run1", "/configs/run2", "/misc"]
+
+        # a family added later takes over the keys its namespace already has
+        with RocksStore(db_path) as store:
+            store.put_many({f"/runs/{i:03d}": {"i": i} for i in range(25)})
+            store.put_string("/runsX/a", "x")
+        with RocksStore(db_path, column_families={"runs": "small"}) as store:
+            assert store._adopt_namespace("runs") == 0  # already moved on open
+            assert store._store.get("/runs/000") is None
+            assert store.get_json("/runs/007") == {"i": 7}
+            assert len(store.get_many([f"/runs/{i:03d}" for i in range(25)])) == 25
+            assert len(list(store.keys_with_prefix("/runs/"))) == 25
+            assert store.get_string("/runsX/a") == "x"
+        with RocksStore(db_path, read_only=True) as store:
+            assert list(store.keys_with_prefix("/runs/0"))[:2] == ["/runs/000", "/runs/001"]
+    finally:
+        shutil.rmtree(db_path, ignore_errors=True)
+
 
 if __name__ == "__main__":
     test_write_df()
     test_read_df()
     test_write_json()
     test_read_json()
+    test_prefix_scans()
+    test_put_get_many()
+    test_column_families()
     
\ No newline at end of file
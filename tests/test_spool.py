@@ -0,0 +1,97 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+import sys
+import shutil
+import sqlite3
+from pathlib import Path
+from metascribe.cli import md_store, md_ingest
+from metascribe.spool import spool_record, ingest_spool
+from metascribe.sql_store import SQLStore
+
+spool_dir = "tests/files/spool"
+sql_path = "tests/files/test_spool.db"
+
+def cleanup():
+    shutil.rmtree(spool_dir, ignore_errors=True)
+    if os.path.exists(sql_path):
+        os.remove(sql_path)
+
+def test_spool_and_ingest():
+    cleanup()
+    try:
+        for i in range(50):
+            spool_record(spool_dir, "jobs", {"jobid": i, "nnodes": i % 4}, pk="jobid")
+        spool_record(spool_dir, "other", {"name": "x"})
+        Path(spool_dir, "garbage.json").write_text("{not json")
+        assert len(list(Path(spool_dir).glob("*.json"))) == 52
+
+        with SQLStore(sql_path) as store:
+            assert ingest_spool(spool_dir, store, batch_size=20) == 51
+        assert list(Path(spool_dir).glob("*.json")) == []
+
+        con = sqlite3.connect(sql_path)
+        assert con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 50
+        assert con.execute("SELECT name FROM other").fetchall() == [("x",)]
+        con.close()
+    finally:
+        cleanup()
+
+def test_partial_failure():
+    cleanup()
+    try:
+        class FailingStore(SQLStore):
+            # commits the first batch, then fails like a database error would
+            def store_many(self, table_name, rows, pk=None, batch_size=10_000):
+                return super().store_many(table_name, list(rows)[:batch_size], pk=pk, batch_size=batch_size)
+
+        for i in range(50):
+            spool_record(spool_dir, "nopk", {"i": i})
+        with FailingStore(sql_path) as store:
+            try:
+                ingest_spool(spool_dir, store, batch_size=20)
+                assert False, "expected IOError"
+            except IOError:
+                pass
+        # only the records that were not committed go back
+        assert len(list(Path(spool_dir).glob("*.json"))) == 30
+        with SQLStore(sql_path) as store:
+            assert ingest_spool(spool_dir, store) == 30
+
+        con = sqlite3.connect(sql_path)
+        assert con.execute("SELECT COUNT(*), COUNT(DISTINCT i) FROM nopk").fetchone() == (50, 50)
+        con.close()
+    finally:
+        cleanup()
+
+def test_cli():
+    cleanup()
+    try:
+        sys.argv = [
+            "md-store",
+            "--table", "metadata3",
+            "--spool", spool_dir,
+            "--template", "tests/files/template1.py",
+            "--file", "tests/files/actual1.py",
+            "--kv_jobid=12345",
+            "--pk=jobid",
+        ]
+        md_store()
+        assert len(list(Path(spool_dir).glob("*.json"))) == 1
+
+        sys.argv = ["md-ingest", spool_dir, "--sql_path", sql_path]
+        md_ingest()
+        con = sqlite3.connect(sql_path)
+        assert con.execute("SELECT jobid, partition FROM metadata3").fetchall() == [(12345, "xxx")]
+        con.close()
+    finally:
+        cleanup()
+
+if __name__ == "__main__":
+    test_spool_and_ingest()
+    test_partial_failure()
+    test_cli()
@@ -4,6 +4,9 @@
 # A copy of the license should have been distributed with this software in 
 # the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
 
+import os
+import sqlite3
+import pandas as pd
 from metascribe.sql_store import SQLStore
 from metascribe.parser import parse_with_template
 
@@ -21,6 +24,97 @@ def test():
     with SQLStore(sql_path) as store:
         store.store("metadata1", pk="jobid", **data, **add_data)
         
+def test_store_many():
+    sql_path = "tests/files/test_bulk.db"
+    if os.path.exists(sql_path):
+        os.remove(sql_path)
+    rows = [{"jobid": i, "nnodes": i % 4, "partition": "xxx"} for i in range(2500)]
+    rows[10] = {"jobid": 10, "partition": "yyy"}  # missing key -> NULL
+    try:
+        with SQLStore(sql_path, journal_mode="WAL", synchronous="NORMAL") as store:
+            assert store.store_many("jobs", iter(rows), pk="jobid", batch_size=1000) == 2500
+            # same pk replaces, DataFrame input
+            df = pd.DataFrame({"jobid": [0, 1], "nnodes": [7, 8], "partition": ["z", "z"]})
+            assert store.store_many("jobs", df, pk="jobid") == 2
+            assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        con = sqlite3.connect(sql_path)
+        assert con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 2500
+        assert con.execute("SELECT nnodes, partition FROM jobs WHERE jobid=10").fetchone() == (None, "yyy")
+        assert con.execute("SELECT nnodes FROM jobs WHERE jobid=1").fetchone() == (8,)
+        con.close()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(sql_path + suffix):
+                os.remove(sql_path + suffix)
+
+def test_schema_evolution():
+    sql_path = "tests/files/test_schema.db"
+    if os.path.exists(sql_path):
+        os.remove(sql_path)
+    try:
+        with SQLStore(sql_path) as store:
+            store.store("jobs", pk="jobid", jobid=1, nnodes=2)
+            store.conn.execute("CREATE INDEX idx_jobs_nnodes ON jobs (nnodes)")
+            # a later template adds a variable
+            store.store("jobs", pk="jobid", jobid=2, nnodes=4, api="mpiio")
+            # INTEGER -> REAL -> TEXT
+            store.store_many("jobs", [{"jobid": 3, "nnodes": 1.5}], pk="jobid")
+            store.store("jobs", pk="jobid", jobid=4, nnodes="many", api=None)
+
+            # steady state: no DDL and no introspection
+            statements = []
+            store.conn.set_trace_callback(statements.append)
+            store.store("jobs", pk="jobid", jobid=5, nnodes="few", api="posix")
+            store.conn.set_trace_callback(None)
+            assert not [s for s in statements if s.startswith(("CREATE", "ALTER", "PRAGMA"))], statements
+
+        con = sqlite3.connect(sql_path)
+        info = {row[1]: (row[2], row[5]) for row in con.execute("PRAGMA table_info(jobs)")}
+        assert info == {"jobid": ("INTEGER", 1), "nnodes": ("TEXT", 0), "api": ("TEXT", 0)}
+        assert con.execute("SELECT jobid, nnodes, api FROM jobs ORDER BY jobid").fetchall() == \
+            [(1, "2.0", None), (2, "4.0", "mpiio"), (3, "1.5", None), (4, "many", None), (5, "few", "posix")]
+        assert con.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='idx_jobs_nnodes'").fetchone()
+        con.close()
+    finally:
+        os.remove(sql_path)
+
+def test_query_and_indexes():
+    sql_path = "tests/files/test_query.db"
+    if os.path.exists(sql_path):
+        os.remove(sql_path)
+    try:
+        with SQLStore(sql_path) as store:
+            # declared before the table and its columns exist
+            idx = store.declare_index("jobs", ["partition", "nnodes"])
+            store.declare_index("jobs", "test_name")
+            rows = [{"jobid": i, "partition": "ab"[i % 2], "nnodes": i % 8} for i in range(1000)]
+            store.store_many("jobs", rows, pk="jobid")
+            store.store("jobs", pk="jobid", jobid=1000, partition="a", nnodes=3, test_name="ior")
+
+            indexes = {r[0] for r in store.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+            assert {idx, "idx_jobs_test_name"} <= indexes
+            plan = store.conn.execute("EXPLAIN QUERY PLAN SELECT jobid FROM jobs WHERE partition = ? AND nnodes = ?",
+                                      ("a", 2)).fetchall()
+            assert idx in str(plan)
+
+            table = store.query("jobs", ["jobid", "nnodes"], where="partition = ? AND nnodes >= ?",
+                                params=("a", 6), order_by="jobid DESC", limit=3)
+            assert table.column("jobid").to_pylist() == [998, 990, 982]
+            assert str(table.schema.field("nnodes").type) == "int64"
+
+            batches = list(store.iter_query("jobs", where="partition = :p", params={"p": "b"}, batch_size=128))
+            assert [b.num_rows for b in batches] == [128, 128, 128, 116]
+
+            df = store.query("jobs", "test_name", where="test_name IS NOT NULL", output="pandas")
+            assert df["test_name"].tolist() == ["ior"]
+            assert store.query("jobs", where="jobid < 0").num_rows == 0
+    finally:
+        os.remove(sql_path)
+
 if __name__ == "__main__":
     test()    
+    test_store_many()
+    test_schema_evolution()
+    test_query_and_indexes()
     
\ No newline at end of file
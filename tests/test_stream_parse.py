@@ -0,0 +1,64 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import os
+from pathlib import Path
+from metascribe.parser import CompiledTemplate, parse_with_template
+from metascribe.stream import parse_mmap, parse_head_tail
+
+template_file = "tests/files/template1.py"
+actual_file = "tests/files/actual1.py"
+big_file = "tests/files/stream_big.out"
+
+head_template = """=== job {{ jobid }} on {{ nodes }} nodes ===
+"""
+tail_template = """=== summary ===
+bandwidth: {{ bw }} MiB/s
+status: {{ status }}
+"""
+
+def test_mmap_same_result():
+    expected = parse_with_template(template_file, actual_file)
+    assert parse_mmap(template_file, actual_file) == expected
+    assert parse_mmap(template_file, actual_file, engine="regex") == expected
+
+def test_head_tail():
+    with open(big_file, "w") as f:
+        f.write("=== job 42 on 8 nodes ===\n")
+        for i in range(200000):
+            f.write(f"iter {i}: bandwidth 1234.5 MiB/s\n")
+        f.write("=== summary ===\nbandwidth: 1234.5 MiB/s\nstatus: OK\n")
+    try:
+        data = parse_head_tail(big_file, CompiledTemplate(head_template), CompiledTemplate(tail_template),
+                               window=4096)
+        assert data == {"jobid": "42", "nodes": "8", "bw": "1234.5", "status": "OK"}
+
+        # a full scan in small windows finds the summary at the end
+        assert parse_mmap(CompiledTemplate(tail_template), big_file, window=4096) == \
+            {"bw": "1234.5", "status": "OK"}
+
+        # the summary is outside the head window
+        try:
+            parse_head_tail(big_file, tail_template=CompiledTemplate(head_template), window=4096)
+            assert False, "should not match"
+        except ValueError:
+            pass
+    finally:
+        os.remove(big_file)
+
+def test_utf8_values():
+    path = "tests/files/stream_utf8.out"
+    Path(path).write_text("user=Jürgen; dir=/home/ü\n", encoding="utf-8")
+    try:
+        compiled = CompiledTemplate("user={{ user }}; dir={{ dir }}\n")
+        assert parse_mmap(compiled, path) == {"user": "Jürgen", "dir": "/home/ü"}
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    test_mmap_same_result()
+    test_head_tail()
+    test_utf8_values()
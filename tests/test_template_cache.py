@@ -0,0 +1,48 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+import shutil
+from pathlib import Path
+from metascribe.parser import TemplateCache, jinja_to_regex, parse_with_template
+
+template_file = "tests/files/template1.py"
+actual_file = "tests/files/actual1.py"
+cache_dir = "tests/files/template_cache"
+
+def test_lru():
+    cache = TemplateCache(maxsize=2)
+    a = cache.get("x={{ a }};")
+    assert cache.get("x={{ a }};") is a
+    cache.get("y={{ b }};")
+    cache.get("z={{ c }};")  # evicts a
+    assert len(cache) == 2
+    assert cache.get("x={{ a }};") is not a
+    assert cache.hits == 1 and cache.misses == 4
+
+def test_same_result():
+    template_text = Path(template_file).read_text()
+    compiled = TemplateCache().get(template_text)
+    assert compiled.pattern == jinja_to_regex(template_text).pattern
+    assert parse_with_template(template_file, actual_file, cache=TemplateCache()) == \
+        compiled.match(Path(actual_file).read_text())
+
+def test_disk_cache():
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    first = TemplateCache(cache_dir=cache_dir)
+    data = parse_with_template(template_file, actual_file, cache=first)
+    assert len(list(Path(cache_dir).glob("*.json"))) == 1
+
+    # a fresh process-level cache is served from disk
+    second = TemplateCache(cache_dir=cache_dir)
+    compiled = second.load(template_file)
+    assert compiled.groups == first.load(template_file).groups
+    assert compiled.match(Path(actual_file).read_text()) == data
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_lru()
+    test_same_result()
+    test_disk_cache()
@@ -0,0 +1,60 @@
+# Copyright (c) 2025, Aravind Sankaran, MLR2D
+# 
+# This software is licensed under the BSD 3-Clause "New" or "Revised" License.
+# A copy of the license should have been distributed with this software in 
+# the LICENSE file. If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+
+from metascribe.template_set import TemplateSet
+from metascribe.parser import parse_with_template
+
+template_file = "tests/files/template1.py"
+actual_file = "tests/files/actual1.py"
+
+mdtest_template = """#!/bin/bash
+#SBATCH --job-name={{ jobname }}
+#SBATCH --nodes={{ nnodes }}
+
+srun mdtest -n {{ n_items }} -d {{ test_dir }}
+"""
+
+def test_overlapping_fragments():
+    tset = TemplateSet()
+    tset.add("he", "he {{ x }}")
+    tset.add("she", "she {{ x }}")
+    tset.add("hers", "hers {{ x }} his")
+    tset.add("xyz", "xyz {{ x }}")
+    # fragments overlap and share text; each is found on its own
+    assert tset.candidates("ushers 1 this") == ["hers", "she", "he"]
+    assert tset.candidates("ushers") == ["she", "he"]
+    assert tset.candidates("") == []
+
+def test_classify():
+    tset = TemplateSet()
+    tset.add_file(template_file, template_id="ior")
+    tset.add("mdtest", mdtest_template)
+    assert len(tset) == 2
+
+    text = open(actual_file).read()
+    assert tset.candidates(text) == ["ior"]
+    tid, data = tset.match_file(actual_file)
+    assert tid == "ior"
+    assert data == parse_with_template(template_file, actual_file)
+
+    tid, data = tset.match("#!/bin/bash\n#SBATCH --job-name=md\n#SBATCH --nodes=4\n\n"
+                           "srun mdtest -n 1000 -d /scratch/x\n")
+    assert tid == "mdtest"
+    assert data == {"jobname": "md", "nnodes": "4", "n_items": "1000", "test_dir": "/scratch/x"}
+
+def test_no_match():
+    tset = TemplateSet(engine="anchor")
+    tset.add("mdtest", mdtest_template)
+    try:
+        tset.match_file(actual_file)
+        assert False, "should not match"
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    test_overlapping_fragments()
+    test_classify()
+    test_no_match()